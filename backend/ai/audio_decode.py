@@ -0,0 +1,181 @@
+import base64
+import struct
+import subprocess
+from math import gcd
+
+import numpy as np
+
+# Whisper and the wav2vec2 emotion model both expect 16 kHz mono float32.
+TARGET_SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioDecodeError(ValueError):
+    """Raised when incoming audio bytes cannot be decoded."""
+
+
+# -------------------------------
+# PCM WAV (no subprocess)
+# -------------------------------
+def _is_wav(raw: bytes) -> bool:
+    return len(raw) >= 12 and raw[:4] == b"RIFF" and raw[8:12] == b"WAVE"
+
+
+def parse_wav_header(raw: bytes):
+    """
+    Walk the RIFF chunks of a WAV file.
+
+    Returns: (format_tag, channels, sample_rate, bits_per_sample, data_offset, data_size)
+    data_size is clamped to the bytes actually present, so streamed WAVs with a
+    placeholder length (0 or 0xFFFFFFFF) still decode.
+    """
+    if not _is_wav(raw):
+        raise AudioDecodeError("Not a RIFF/WAVE file.")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(raw):
+        chunk_id = raw[pos : pos + 4]
+        (chunk_size,) = struct.unpack_from("<I", raw, pos + 4)
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from(
+                "<HHIIHH", raw, body
+            )
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # SubFormat GUID starts with the real format tag
+                (format_tag,) = struct.unpack_from("<H", raw, body + 24)
+            fmt = (format_tag, channels, sample_rate, bits)
+
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioDecodeError("WAV data chunk appears before fmt chunk.")
+            available = len(raw) - body
+            if chunk_size == 0 or chunk_size > available:
+                chunk_size = available
+            return (*fmt, body, chunk_size)
+
+        # chunks are word-aligned
+        pos = body + chunk_size + (chunk_size & 1)
+
+    raise AudioDecodeError("WAV file has no data chunk.")
+
+
+def pcm_to_float32(
+    pcm: bytes, format_tag: int, bits_per_sample: int, channels: int
+) -> np.ndarray:
+    """Convert interleaved PCM/float frames to a mono float32 array in [-1, 1]."""
+    sample_width = bits_per_sample // 8
+    frame_width = sample_width * channels
+    usable = len(pcm) - (len(pcm) % frame_width) if frame_width else 0
+    buf = memoryview(pcm)[:usable]
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits_per_sample == 32:
+        samples = np.frombuffer(buf, dtype="<f4").astype(np.float32)
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits_per_sample == 64:
+        samples = np.frombuffer(buf, dtype="<f8").astype(np.float32)
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 16:
+        samples = np.frombuffer(buf, dtype="<i2").astype(np.float32) / 32768.0
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 32:
+        samples = np.frombuffer(buf, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 8:
+        samples = (np.frombuffer(buf, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 24:
+        b = np.frombuffer(buf, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8
+        samples = ints.astype(np.float32) / 8388608.0
+    else:
+        raise AudioDecodeError(
+            f"Unsupported WAV encoding (format={format_tag}, bits={bits_per_sample})."
+        )
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE):
+    """Polyphase resampling (e.g. the Flutter client's 44.1 kHz → 16 kHz)."""
+    if orig_sr == target_sr or audio.size == 0:
+        return audio.astype(np.float32, copy=False)
+
+    from scipy.signal import resample_poly
+
+    g = gcd(int(orig_sr), int(target_sr))
+    out = resample_poly(audio, target_sr // g, orig_sr // g)
+    return out.astype(np.float32, copy=False)
+
+
+def decode_wav_bytes(raw: bytes, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    format_tag, channels, sample_rate, bits, offset, size = parse_wav_header(raw)
+    samples = pcm_to_float32(raw[offset : offset + size], format_tag, bits, channels)
+    return resample(samples, sample_rate, target_sr)
+
+
+# -------------------------------
+# Everything else: ffmpeg over pipes
+# -------------------------------
+def decode_with_ffmpeg(raw: bytes, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    ffmpeg stdin → stdout 으로 바로 16kHz mono f32le PCM 으로 디코딩 (디스크 사용 없음).
+    """
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(target_sr),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+    proc = subprocess.run(cmd, input=raw, capture_output=True)
+    if proc.returncode != 0:
+        raise AudioDecodeError(
+            f"ffmpeg decode failed: {proc.stderr.decode('utf-8', 'replace').strip()}"
+        )
+    return np.frombuffer(proc.stdout, dtype="<f4").astype(np.float32)
+
+
+# -------------------------------
+# Entry points
+# -------------------------------
+def decode_audio_bytes(
+    raw: bytes, audio_format: str | None = None, target_sr: int = TARGET_SAMPLE_RATE
+) -> np.ndarray:
+    """
+    Decode an uploaded utterance once, in memory.
+
+    The container is sniffed from the bytes (PCM WAV is parsed directly, anything
+    else is piped through ffmpeg); audio_format is only a client-side hint.
+
+    Returns: 16 kHz mono float32 numpy array, shared by Whisper and the emotion model.
+    """
+    if not raw:
+        raise AudioDecodeError("Empty audio payload.")
+
+    if _is_wav(raw):
+        try:
+            return decode_wav_bytes(raw, target_sr)
+        except AudioDecodeError:
+            # e.g. ADPCM / mu-law WAVs — let ffmpeg handle them
+            pass
+
+    return decode_with_ffmpeg(raw, target_sr)
+
+
+def decode_audio_base64(
+    audio_b64: str, audio_format: str | None = None, target_sr: int = TARGET_SAMPLE_RATE
+) -> np.ndarray:
+    if not audio_b64:
+        raise AudioDecodeError("Missing audio.")
+    return decode_audio_bytes(base64.b64decode(audio_b64), audio_format, target_sr)
@@ -0,0 +1,352 @@
+import os
+import struct
+import subprocess
+import threading
+
+import numpy as np
+
+from ai.audio_decode import (
+    TARGET_SAMPLE_RATE,
+    WAVE_FORMAT_PCM,
+    AudioDecodeError,
+    _is_wav,
+    parse_wav_header,
+    pcm_to_float32,
+    resample,
+)
+from ai.vad import frame_levels_db, silence_run_lengths
+
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "60"))
+ENDPOINT_SILENCE_MS = float(os.getenv("ENDPOINT_SILENCE_MS", "700"))
+
+
+# -------------------------------
+# Ring buffer
+# -------------------------------
+class RingBuffer:
+    """Fixed-capacity float32 sample buffer; the oldest samples are dropped on overflow."""
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+        self.total_written = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, samples: np.ndarray):
+        n = len(samples)
+        if n == 0:
+            return
+        self.total_written += n
+        if n >= self.capacity:
+            self.dropped += self._size + n - self.capacity
+            self._buf[:] = samples[-self.capacity :]
+            self._start, self._size = 0, self.capacity
+            return
+
+        overflow = self._size + n - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._size -= overflow
+            self.dropped += overflow
+
+        end = (self._start + self._size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._buf[end : end + first] = samples[:first]
+        self._buf[: n - first] = samples[first:]
+        self._size += n
+
+    def read(self) -> np.ndarray:
+        """Contiguous copy of the buffered samples, oldest first."""
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._buf[self._start : end].copy()
+        return np.concatenate(
+            (self._buf[self._start :], self._buf[: end - self.capacity])
+        )
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+# -------------------------------
+# Incremental decoders
+# -------------------------------
+class PcmStreamDecoder:
+    """
+    Streamed PCM WAV (header in the first chunk) or headerless PCM
+    ("audio/pcm;rate=16000", s16le mono). Converts each chunk as it arrives.
+    """
+
+    def __init__(self, sample_rate=TARGET_SAMPLE_RATE, channels=1, bits=16, headerless=False):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bits = bits
+        self.format_tag = WAVE_FORMAT_PCM
+        self._need_header = not headerless
+        self._pending = b""
+
+    def feed(self, data: bytes) -> np.ndarray:
+        self._pending += data
+        if self._need_header:
+            try:
+                tag, channels, rate, bits, offset, _ = parse_wav_header(self._pending)
+            except (AudioDecodeError, struct.error):
+                if len(self._pending) > 4096:
+                    raise
+                return np.zeros(0, dtype=np.float32)  # header not complete yet
+            self.format_tag, self.channels, self.sample_rate, self.bits = (
+                tag,
+                channels,
+                rate,
+                bits,
+            )
+            self._pending = self._pending[offset:]
+            self._need_header = False
+
+        frame = self.bits // 8 * self.channels
+        usable = len(self._pending) - len(self._pending) % frame
+        chunk, self._pending = self._pending[:usable], self._pending[usable:]
+        return pcm_to_float32(chunk, self.format_tag, self.bits, self.channels)
+
+    def finish(self) -> np.ndarray:
+        return np.zeros(0, dtype=np.float32)
+
+
+class FfmpegStreamDecoder:
+    """
+    Compressed streams (webm/ogg/...): one long-lived ffmpeg process per utterance,
+    chunks written to stdin, 16 kHz f32le read back from stdout by a reader thread.
+    """
+
+    sample_rate = TARGET_SAMPLE_RATE
+
+    def __init__(self, on_samples):
+        self._on_samples = on_samples
+        self._proc = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-i",
+                "pipe:0",
+                "-ac",
+                "1",
+                "-ar",
+                str(TARGET_SAMPLE_RATE),
+                "-f",
+                "f32le",
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        leftover = b""
+        while True:
+            data = self._proc.stdout.read1(16384)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % 4
+            leftover = data[usable:]
+            self._on_samples(np.frombuffer(data[:usable], dtype="<f4").copy())
+
+    def feed(self, data: bytes) -> np.ndarray:
+        self._proc.stdin.write(data)
+        self._proc.stdin.flush()
+        return np.zeros(0, dtype=np.float32)  # samples arrive via the reader thread
+
+    def finish(self) -> np.ndarray:
+        self._proc.stdin.close()
+        self._proc.wait()
+        self._reader.join()
+        if self._proc.returncode != 0:
+            raise AudioDecodeError(
+                "ffmpeg decode failed: "
+                + self._proc.stderr.read().decode("utf-8", "replace").strip()
+            )
+        return np.zeros(0, dtype=np.float32)
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+
+
+# -------------------------------
+# End-of-speech detection
+# -------------------------------
+class Endpointer:
+    """
+    Frame-energy end-of-utterance detector: speech must be seen first, then
+    silence_ms of consecutive quiet frames marks the end.
+    """
+
+    def __init__(
+        self,
+        sample_rate,
+        silence_ms=ENDPOINT_SILENCE_MS,
+        frame_ms=30.0,
+        threshold_db=-40.0,
+        min_speech_ms=150.0,
+    ):
+        self.frame = max(1, int(sample_rate * frame_ms / 1000.0))
+        self.silence_frames = max(1, int(silence_ms / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.threshold_db = threshold_db
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._speech_frames = 0
+        self._silent_run = 0
+
+    def update(self, samples: np.ndarray) -> bool:
+        """Feed new samples; True once the speaker has stopped."""
+        data = np.concatenate((self._carry, samples)) if len(self._carry) else samples
+        n = len(data) // self.frame
+        self._carry = data[n * self.frame :]
+        if n == 0:
+            return False
+
+        loud = frame_levels_db(data[: n * self.frame], self.frame) >= self.threshold_db
+        speech_so_far = self._speech_frames + np.cumsum(loud)
+        runs = silence_run_lengths(loud, self._silent_run)
+
+        self._speech_frames = int(speech_so_far[-1])
+        self._silent_run = int(runs[-1])
+        return bool(
+            np.any(
+                (speech_so_far >= self.min_speech_frames)
+                & (runs >= self.silence_frames)
+            )
+        )
+
+
+# -------------------------------
+# Per-session utterance stream
+# -------------------------------
+class UtteranceSegment:
+    """One endpointed utterance cut from a continuous stream (see UtteranceStream.cut)."""
+
+    def __init__(self, audio, chunks, bytes_received, dropped_seconds):
+        self._audio = audio
+        self.chunks = chunks
+        self.bytes_received = bytes_received
+        self.dropped_seconds = dropped_seconds
+
+    def finish(self) -> np.ndarray:
+        return self._audio
+
+    def close(self):
+        pass
+
+
+class UtteranceStream:
+    """
+    Collects audio_chunk payloads for one utterance.
+
+        stream = UtteranceStream("audio/wav")
+        ended = stream.feed(chunk)      # True when server-side endpointing fires
+        segment = stream.cut()          # that utterance; the stream keeps going
+        audio = stream.finish()         # 16 kHz mono float32, closes the stream
+
+    The decoder (parsed WAV header / ffmpeg process) lives for the whole stream:
+    a continuous WAV or webm upload carries its header only once, so only the
+    ring buffer and the endpointer start over after a cut().
+    """
+
+    def __init__(self, audio_format=None, first_chunk=b"", max_seconds=STREAM_MAX_SECONDS):
+        fmt = (audio_format or "").lower()
+        self._lock = threading.Lock()
+        self._new = []
+
+        if _is_wav(first_chunk) or "wav" in fmt:
+            self.decoder = PcmStreamDecoder()
+        elif "pcm" in fmt or "l16" in fmt:
+            rate = TARGET_SAMPLE_RATE
+            for part in fmt.split(";"):
+                if part.strip().startswith("rate="):
+                    rate = int(part.split("=", 1)[1])
+            self.decoder = PcmStreamDecoder(sample_rate=rate, headerless=True)
+        else:
+            self.decoder = FfmpegStreamDecoder(self._push)
+
+        self.max_seconds = max_seconds
+        self.buffer = None
+        self.endpointer = None
+        self.chunks = 0
+        self.bytes_received = 0
+
+    def _ensure_buffer(self):
+        if self.buffer is None:
+            rate = self.decoder.sample_rate
+            self.buffer = RingBuffer(int(rate * self.max_seconds))
+            self.endpointer = Endpointer(rate)
+
+    def _push(self, samples):
+        with self._lock:
+            self._new.append(samples)
+
+    def _drain(self) -> np.ndarray:
+        with self._lock:
+            new, self._new = self._new, []
+        if not new:
+            return np.zeros(0, dtype=np.float32)
+        return new[0] if len(new) == 1 else np.concatenate(new)
+
+    def feed(self, data: bytes) -> bool:
+        self.chunks += 1
+        self.bytes_received += len(data)
+        samples = self.decoder.feed(data)
+        if len(samples):
+            self._push(samples)
+
+        new = self._drain()
+        if not len(new) and self.buffer is None:
+            return False
+        self._ensure_buffer()
+        self.buffer.append(new)
+        return self.endpointer.update(new)
+
+    def cut(self) -> UtteranceSegment:
+        """Take the audio so far as one utterance and start the next one."""
+        self._ensure_buffer()
+        self.buffer.append(self._drain())
+        segment = UtteranceSegment(
+            resample(self.buffer.read(), self.decoder.sample_rate),
+            self.chunks,
+            self.bytes_received,
+            self.dropped_seconds,
+        )
+        self.buffer = None
+        self.endpointer = None
+        self.chunks = 0
+        self.bytes_received = 0
+        return segment
+
+    def finish(self) -> np.ndarray:
+        tail = self.decoder.finish()
+        if len(tail):
+            self._push(tail)
+        self._ensure_buffer()
+        self.buffer.append(self._drain())
+        return resample(self.buffer.read(), self.decoder.sample_rate)
+
+    def close(self):
+        if isinstance(self.decoder, FfmpegStreamDecoder):
+            self.decoder.close()
+
+    @property
+    def dropped_seconds(self):
+        if self.buffer is None:
+            return 0.0
+        return self.buffer.dropped / float(self.decoder.sample_rate)
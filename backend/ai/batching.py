@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Cross-session dynamic batching.
+
+    Callers from any thread submit() a single item and get a Future back. A
+    background thread collects pending items for up to max_wait_ms (measured from
+    the oldest pending item) or max_batch_size items, whichever comes first, and
+    hands them to process_batch(items) -> list of results in the same order.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=10.0, name="batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    def submit(self, item) -> Future:
+        self._ensure_started()
+        future = Future()
+        with self._stats_lock:
+            self._submitted += 1
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._started_at = time.perf_counter()
+            self._submitted = 0
+            self._completed = 0
+            self._failed = 0
+            self._batches = 0
+            self._max_batch = 0
+            self._queue_wait_total = 0.0
+            self._queue_wait_max = 0.0
+            self._process_total = 0.0
+            self._latency_total = 0.0
+            self._latency_max = 0.0
+
+    def stats(self):
+        """Throughput and latency counters for tuning max_wait_ms / max_batch_size."""
+        with self._stats_lock:
+            elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+            done = max(self._completed + self._failed, 1)
+            batches = max(self._batches, 1)
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "pending": self._queue.qsize(),
+                "batches": self._batches,
+                "avg_batch_size": (self._completed + self._failed) / batches,
+                "max_batch_size_seen": self._max_batch,
+                "items_per_sec": self._completed / elapsed,
+                "avg_queue_wait_ms": self._queue_wait_total / done * 1000.0,
+                "max_queue_wait_ms": self._queue_wait_max * 1000.0,
+                "avg_batch_process_ms": self._process_total / batches * 1000.0,
+                "avg_latency_ms": self._latency_total / done * 1000.0,
+                "max_latency_ms": self._latency_max * 1000.0,
+            }
+
+    # -------------------------------
+    # Worker
+    # -------------------------------
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = self._collect(first)
+            items = [entry[0] for entry in batch]
+            started = time.perf_counter()
+            try:
+                results = self.process_batch(items)
+                error = None
+            except Exception as e:
+                results = None
+                error = e
+            finished = time.perf_counter()
+
+            for i, (_, future, _) in enumerate(batch):
+                if future.set_running_or_notify_cancel():
+                    if error is None:
+                        future.set_result(results[i])
+                    else:
+                        future.set_exception(error)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._max_batch = max(self._max_batch, len(batch))
+                self._process_total += finished - started
+                if error is None:
+                    self._completed += len(batch)
+                else:
+                    self._failed += len(batch)
+                for _, _, enqueued in batch:
+                    wait = started - enqueued
+                    latency = finished - enqueued
+                    self._queue_wait_total += wait
+                    self._queue_wait_max = max(self._queue_wait_max, wait)
+                    self._latency_total += latency
+                    self._latency_max = max(self._latency_max, latency)
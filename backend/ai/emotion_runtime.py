@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# -------------------------------
+# Emotion classifier runtimes
+# -------------------------------
+#   EMOTION_MODEL_MODE=fp32      (default) PyTorch eager, FP32
+#   EMOTION_MODEL_MODE=int8      PyTorch with dynamically int8-quantized nn.Linear
+#   EMOTION_MODEL_MODE=onnx      exported graph on onnxruntime (CPU)
+#   EMOTION_MODEL_MODE=onnx-int8 same graph with int8-quantized weights
+#
+# Every runtime takes the feature extractor output as numpy arrays and returns
+# numpy logits, so speech_detection does not care which one is loaded.
+# The ONNX graph is exported once to EMOTION_ONNX_PATH and reused afterwards
+# (needs the onnx + onnxruntime packages).
+#
+# Compare the modes on your own recordings:
+#   python -m ai.emotion_runtime --wav-dir recordings/ --modes fp32,int8,onnx
+
+EMOTION_MODEL_NAME = "superb/wav2vec2-base-superb-er"
+EMOTION_MODEL_MODE = os.getenv("EMOTION_MODEL_MODE", "fp32").lower()
+EMOTION_ONNX_PATH = os.getenv("EMOTION_ONNX_PATH", "emotion_wav2vec2.onnx")
+EMOTION_MODES = ("fp32", "int8", "onnx", "onnx-int8")
+
+
+class TorchEmotionClassifier:
+    def __init__(self, extractor, model, mode="fp32"):
+        self.extractor = extractor
+        self.model = model
+        self.mode = mode
+        self.id2label = model.config.id2label
+
+    def logits(self, input_values, attention_mask=None):
+        import torch
+
+        inputs = {"input_values": torch.from_numpy(np.asarray(input_values, dtype=np.float32))}
+        if attention_mask is not None:
+            inputs["attention_mask"] = torch.from_numpy(
+                np.asarray(attention_mask, dtype=np.int64)
+            )
+        with torch.no_grad():
+            return self.model(**inputs).logits.numpy()
+
+
+class OnnxEmotionClassifier:
+    def __init__(self, extractor, session, id2label, mode="onnx"):
+        self.extractor = extractor
+        self.session = session
+        self.mode = mode
+        self.id2label = id2label
+
+    def logits(self, input_values, attention_mask=None):
+        if attention_mask is None:
+            attention_mask = np.ones(input_values.shape, dtype=np.int64)
+        return self.session.run(
+            ["logits"],
+            {
+                "input_values": input_values.astype(np.float32),
+                "attention_mask": attention_mask.astype(np.int64),
+            },
+        )[0]
+
+
+def export_onnx(model, path):
+    """wav2vec2 classifier → ONNX with dynamic batch and length axes."""
+    import torch
+
+    class _Logits(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_values, attention_mask):
+            return self.inner(input_values, attention_mask=attention_mask).logits
+
+    dummy = torch.zeros(1, 16000)
+    torch.onnx.export(
+        _Logits(model),
+        (dummy, torch.ones(1, 16000, dtype=torch.int64)),
+        path,
+        input_names=["input_values", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_values": {0: "batch", 1: "samples"},
+            "attention_mask": {0: "batch", 1: "samples"},
+            "logits": {0: "batch"},
+        },
+        opset_version=14,
+    )
+
+
+def _onnx_session(path):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(
+        path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+def load_emotion_classifier(mode=EMOTION_MODEL_MODE, model_name=EMOTION_MODEL_NAME):
+    if mode not in EMOTION_MODES:
+        raise ValueError(f"Unknown EMOTION_MODEL_MODE '{mode}' (choose from {EMOTION_MODES})")
+
+    from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
+
+    extractor = AutoFeatureExtractor.from_pretrained(model_name)
+    model = AutoModelForAudioClassification.from_pretrained(model_name)
+    model.eval()
+
+    if mode == "fp32":
+        return TorchEmotionClassifier(extractor, model, mode)
+
+    if mode == "int8":
+        import torch
+
+        quantized = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        return TorchEmotionClassifier(extractor, quantized, mode)
+
+    path = EMOTION_ONNX_PATH
+    if not os.path.exists(path):
+        print(f"[EMOTION] exporting {model_name} → {path}")
+        export_onnx(model, path)
+    if mode == "onnx-int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = path.replace(".onnx", ".int8.onnx")
+        if not os.path.exists(quantized_path):
+            quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+        path = quantized_path
+
+    id2label = dict(model.config.id2label)
+    del model  # the session holds its own copy of the weights
+    return OnnxEmotionClassifier(extractor, _onnx_session(path), id2label, mode)
+
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+# -------------------------------
+# Mode comparison tool
+# -------------------------------
+def _wav_files(wav_dir):
+    return sorted(
+        os.path.join(wav_dir, name)
+        for name in os.listdir(wav_dir)
+        if name.lower().endswith(".wav")
+    )
+
+
+def _run_mode(mode, files, repeat):
+    """Runs inside a fresh process so peak memory belongs to this mode only."""
+    import resource
+
+    from ai.audio_decode import TARGET_SAMPLE_RATE, decode_audio_bytes
+
+    clips = []
+    for path in files:
+        with open(path, "rb") as f:
+            clips.append(decode_audio_bytes(f.read()))
+
+    t0 = time.perf_counter()
+    classifier = load_emotion_classifier(mode)
+    load_ms = (time.perf_counter() - t0) * 1000.0
+
+    def classify(speech):
+        inputs = classifier.extractor(
+            speech, sampling_rate=TARGET_SAMPLE_RATE, return_tensors="np"
+        )
+        return softmax(classifier.logits(inputs["input_values"]))[0]
+
+    classify(clips[0])  # warm kernels
+
+    latencies, results = [], []
+    for speech in clips:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            probs = classify(speech)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        results.append(
+            {
+                "emotion": classifier.id2label[int(np.argmax(probs))],
+                "scores": [round(float(p), 4) for p in probs],
+            }
+        )
+
+    audio_seconds = sum(len(c) for c in clips) / TARGET_SAMPLE_RATE * repeat
+    return {
+        "mode": mode,
+        "load_ms": round(load_ms, 1),
+        "mean_ms": round(float(np.mean(latencies)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "realtime_factor": round(sum(latencies) / 1000.0 / audio_seconds, 4),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+
+
+def compare_modes(wav_dir, modes, repeat=3):
+    wav_dir = os.path.abspath(wav_dir)
+    files = _wav_files(wav_dir)
+    if not files:
+        raise SystemExit(f"No .wav files in {wav_dir}")
+
+    runs = {}
+    for mode in modes:
+        proc = subprocess.run(
+            [sys.executable, "-m", "ai.emotion_runtime", "--worker", mode,
+             "--wav-dir", wav_dir, "--repeat", str(repeat)],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        if proc.returncode != 0:
+            runs[mode] = {"mode": mode, "error": proc.stderr.strip().splitlines()[-1:]}
+            continue
+        runs[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    baseline = runs.get("fp32")
+    report = {"files": len(files), "repeat": repeat, "modes": {}}
+    for mode, run in runs.items():
+        if "error" in run:
+            report["modes"][mode] = run
+            continue
+        summary = {k: v for k, v in run.items() if k != "results"}
+        if baseline and "error" not in baseline:
+            pairs = list(zip(baseline["results"], run["results"]))
+            summary["label_agreement"] = round(
+                sum(a["emotion"] == b["emotion"] for a, b in pairs) / len(pairs), 4
+            )
+            summary["max_score_delta"] = round(
+                max(
+                    float(np.max(np.abs(np.subtract(a["scores"], b["scores"]))))
+                    for a, b in pairs
+                ),
+                4,
+            )
+            summary["speedup_vs_fp32"] = round(baseline["mean_ms"] / run["mean_ms"], 2)
+        report["modes"][mode] = summary
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare emotion model runtimes")
+    parser.add_argument("--wav-dir", required=True)
+    parser.add_argument("--modes", default="fp32,int8,onnx")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_run_mode(args.worker, _wav_files(args.wav_dir), args.repeat)))
+    else:
+        report = compare_modes(args.wav_dir, args.modes.split(","), args.repeat)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
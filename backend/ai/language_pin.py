@@ -0,0 +1,53 @@
+import os
+
+# -------------------------------
+# Per-session speaker language pinning
+# -------------------------------
+# A conversation has exactly two speakers. Once a speaker's language is known
+# with enough confidence it is passed to Whisper as a hint, which skips language
+# detection on every following turn.
+#
+# State is a plain JSON-friendly dict so it can live in any session store:
+#   {"1": {"lang": "ko", "probability": 0.97, "turns": 4}, "2": {...}}
+
+LANG_PIN_ENABLED = os.getenv("LANG_PIN_ENABLED", "1") == "1"
+LANG_PIN_MIN_PROB = float(os.getenv("LANG_PIN_MIN_PROB", "0.8"))
+
+
+def language_hint(state: dict, speaker_id, force_detect: bool = False, fallback=None):
+    """
+    Language to pin for this speaker's next turn, or None to run detection.
+
+    fallback: language expected from the conversation itself (Speaker 2 answers
+              in Speaker 1's target language) — used until the speaker is learned.
+    """
+    if not LANG_PIN_ENABLED or force_detect:
+        return None
+    known = state.get(str(speaker_id))
+    if known and known.get("lang"):
+        if known.get("probability", 1.0) >= LANG_PIN_MIN_PROB:
+            return known["lang"]
+        return None
+    return fallback
+
+
+def learn_language(state: dict, speaker_id, asr_result: dict):
+    """Record what Whisper reported for this speaker's turn."""
+    key = str(speaker_id)
+    known = state.get(key) or {"lang": None, "probability": 0.0, "turns": 0}
+    known["turns"] = known.get("turns", 0) + 1
+
+    if asr_result.get("language_detected"):
+        known["lang"] = asr_result.get("language")
+        known["probability"] = asr_result.get("language_probability") or 0.0
+    elif asr_result.get("language"):
+        # pinned decode passed the confidence check — keep trusting it
+        known["lang"] = asr_result["language"]
+        known["probability"] = max(known.get("probability") or 0.0, LANG_PIN_MIN_PROB)
+
+    state[key] = known
+    return known
+
+
+def reset_languages(state: dict):
+    state.clear()
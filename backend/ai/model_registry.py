@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+from ai.metrics import MODEL_LOAD
+
+# -------------------------------
+# Lazy model registry
+# -------------------------------
+# Models are registered by name with a loader (and optionally a warm-up that runs
+# one dummy inference). Nothing is loaded at import: the first get(name) loads
+# the model, or warm_up_in_background() loads and warms everything at startup
+# while the server already answers non-inference endpoints. Each model is
+# loaded exactly once per process, however many callers ask for it.
+#
+# With MODEL_EXECUTOR=process every worker process has its own registry and
+# loads its models on the first turn it runs.
+
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+# models that must be hot before /ready reports ready
+MODEL_READY_REQUIRED = [
+    name.strip()
+    for name in os.getenv("MODEL_READY_REQUIRED", "whisper,emotion").split(",")
+    if name.strip()
+]
+
+
+class _Entry:
+    def __init__(self, name, loader, warmup):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.model = None
+        self.state = "unloaded"  # unloaded → loading → loaded → ready | failed
+        self.error = None
+        self.load_ms = None
+        self.warmup_ms = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+
+    def register(self, name, loader, warmup=None):
+        """loader() → model; warmup(model) runs one dummy inference."""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(name, loader, warmup)
+
+    def _entry(self, name):
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"Unknown model '{name}'") from None
+
+    def get(self, name):
+        """Singleton model by name, loaded on first use."""
+        entry = self._entry(name)
+        if entry.model is not None:
+            return entry.model
+        with entry.lock:
+            if entry.model is None:
+                entry.state = "loading"
+                t0 = time.perf_counter()
+                try:
+                    model = entry.loader()
+                except Exception as e:
+                    entry.state = "failed"
+                    entry.error = str(e)
+                    raise
+                entry.load_ms = (time.perf_counter() - t0) * 1000.0
+                MODEL_LOAD.observe(entry.load_ms / 1000.0, model=name, phase="load")
+                entry.model = model
+                entry.error = None
+                entry.state = "loaded" if entry.warmup else "ready"
+                print(f"[MODEL] {name} loaded in {entry.load_ms:.0f} ms")
+        return entry.model
+
+    def override(self, name, model):
+        """Install an already-built model (benchmark / test stand-ins)."""
+        entry = self._entry(name)
+        with entry.lock:
+            entry.model = model
+            entry.state = "ready"
+            entry.error = None
+
+    def warm(self, name):
+        """Load + one dummy inference so the first real request is not the slow one."""
+        entry = self._entry(name)
+        model = self.get(name)
+        if entry.state != "loaded":
+            return model
+        with entry.lock:
+            if entry.state == "loaded":
+                t0 = time.perf_counter()
+                try:
+                    entry.warmup(model)
+                except Exception as e:
+                    # the model itself works; a failed warm-up only costs latency
+                    print(f"⚠️ Warm-up of {name} failed: {e}")
+                entry.warmup_ms = (time.perf_counter() - t0) * 1000.0
+                MODEL_LOAD.observe(entry.warmup_ms / 1000.0, model=name, phase="warmup")
+                entry.state = "ready"
+                print(f"[MODEL] {name} warmed up in {entry.warmup_ms:.0f} ms")
+        return model
+
+    def warm_up_in_background(self, names=None):
+        """Load + warm the given models (default: all) on a daemon thread."""
+        names = list(names or self._entries)
+
+        def run():
+            for name in names:
+                try:
+                    self.warm(name)
+                except Exception as e:
+                    print(f"⚠️ Loading {name} failed: {e}")
+
+        with self._lock:
+            if self._warmup_thread is None or not self._warmup_thread.is_alive():
+                self._warmup_thread = threading.Thread(
+                    target=run, name="model-warmup", daemon=True
+                )
+                self._warmup_thread.start()
+        return self._warmup_thread
+
+    def is_ready(self, names=None):
+        names = MODEL_READY_REQUIRED if names is None else names
+        return all(
+            name in self._entries and self._entries[name].state == "ready"
+            for name in names
+        )
+
+    def status(self):
+        return {
+            name: {
+                "state": entry.state,
+                "load_ms": round(entry.load_ms, 1) if entry.load_ms is not None else None,
+                "warmup_ms": round(entry.warmup_ms, 1)
+                if entry.warmup_ms is not None
+                else None,
+                "error": entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+
+class StopPipeline(Exception):
+    """
+    Raised by a stage to end the run early (e.g. all-silence input). The value
+    becomes that stage's result and every stage not yet finished is cancelled.
+    """
+
+    def __init__(self, value=None):
+        super().__init__()
+        self.value = value
+
+
+class Stage:
+    """
+    One node of a StagePipeline.
+
+    fn: async callable(ctx, results) -> value
+        ctx     - per-run context dict passed to StagePipeline.run()
+        results - dict of finished stage outputs (all of this stage's deps are present)
+    """
+
+    def __init__(self, name: str, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class PipelineRun:
+    def __init__(self, results, timings, total_ms, stopped_at=None):
+        self.results = results
+        self.timings = timings
+        self.total_ms = total_ms
+        self.stopped_at = stopped_at  # name of the stage that raised StopPipeline
+
+    def timings_ms(self):
+        """{"decode": 12.3, "asr": 410.2, ..., "total": 530.1} — durations only."""
+        out = {name: t["duration_ms"] for name, t in self.timings.items()}
+        out["total"] = self.total_ms
+        return out
+
+
+class StagePipeline:
+    """
+    Dependency-graph runner: every stage starts as soon as all of its deps have
+    finished, so independent stages (e.g. ASR and emotion) overlap and a run
+    takes roughly the critical path instead of the sum of all stages.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        names = [s.name for s in self.stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate stage names in pipeline.")
+
+        # stages must be declared after their dependencies (keeps cycles out)
+        seen = set()
+        for stage in self.stages:
+            missing = [d for d in stage.deps if d not in seen]
+            if missing:
+                raise ValueError(
+                    f"Stage '{stage.name}' depends on undeclared/later stages: {missing}"
+                )
+            seen.add(stage.name)
+
+    async def run(self, ctx=None, on_stage=None) -> PipelineRun:
+        """
+        on_stage: optional async callable(name, value, results) scheduled as each
+                  stage finishes (used for progressive responses). Callbacks run
+                  beside the graph, so a slow callback never delays dependent
+                  stages; run() waits for all of them before returning.
+        """
+        ctx = {} if ctx is None else ctx
+        results = {}
+        timings = {}
+        tasks = {}
+        callbacks = []
+        t0 = time.perf_counter()
+
+        async def run_stage(stage):
+            if stage.deps:
+                await asyncio.gather(*(tasks[d] for d in stage.deps))
+            started = time.perf_counter()
+            try:
+                value = await stage.fn(ctx, results)
+            except StopPipeline as stop:
+                stop.stage = stage.name
+                results[stage.name] = stop.value
+                timings[stage.name] = _timing(t0, started, time.perf_counter())
+                raise
+            finished = time.perf_counter()
+
+            results[stage.name] = value
+            timings[stage.name] = _timing(t0, started, finished)
+            if on_stage is not None:
+                callbacks.append(
+                    asyncio.ensure_future(on_stage(stage.name, value, results))
+                )
+            return value
+
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        stopped_at = None
+        try:
+            await asyncio.gather(*tasks.values())
+            total_ms = round((time.perf_counter() - t0) * 1000.0, 2)
+            await asyncio.gather(*callbacks)
+        except StopPipeline as stop:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            total_ms = round((time.perf_counter() - t0) * 1000.0, 2)
+            await asyncio.gather(*callbacks)
+            stopped_at = stop.stage
+        except BaseException:
+            pending = list(tasks.values()) + callbacks
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+
+        return PipelineRun(results, timings, total_ms, stopped_at)
+
+
+def _timing(t0, started, finished):
+    return {
+        "start_ms": round((started - t0) * 1000.0, 2),
+        "end_ms": round((finished - t0) * 1000.0, 2),
+        "duration_ms": round((finished - started) * 1000.0, 2),
+    }
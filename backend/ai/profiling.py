@@ -0,0 +1,268 @@
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# -------------------------------
+# On-demand profiling of speech turns
+# -------------------------------
+# An admin arms the profiler for the next N turns (globally or for one session).
+# A claimed turn gets a ProfileCapture bound to a context variable; run_model /
+# run_io see it and wrap their call in cProfile, and model calls additionally
+# in the torch operator profiler. When nothing is armed, claim() is one
+# attribute check and the executors do one ContextVar lookup — no profiler is
+# ever installed.
+#
+# Each capture is written to PROFILE_DIR/<capture_id>/:
+#   python.prof    pstats dump (snakeviz / `python -m pstats`)
+#   torch_ops.txt  torch operator table per model call
+#   summary.json   stage timings + top functions
+#
+# The event-loop side of a turn is not profiled (it is shared with every other
+# session); its share shows up as stage time not covered by the executor calls.
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TORCH = os.getenv("PROFILE_TORCH", "1") == "1"
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+
+PROFILE_FILES = ("python.prof", "torch_ops.txt", "summary.json")
+
+_active_capture = contextvars.ContextVar("profile_capture", default=None)
+# the torch profiler is process-wide: one model call at a time is recorded
+_torch_lock = threading.Lock()
+
+
+def current_capture():
+    return _active_capture.get()
+
+
+class ProfileCapture:
+    def __init__(self, directory, session_id, turn_id=None):
+        self.capture_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.directory = os.path.join(directory, self.capture_id)
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.started_at = datetime.utcnow().isoformat()
+        self.calls = []
+        self.skipped = 0
+        self._profiles = []
+        self._torch_tables = []
+        self._lock = threading.Lock()
+
+    def activate(self):
+        return _active_capture.set(self)
+
+    def deactivate(self, token):
+        _active_capture.reset(token)
+
+    def run(self, fn, model=False):
+        """Call fn() under cProfile (and the torch profiler when model=True)."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: only one cProfile may be active per process
+            profile = None
+            with self._lock:
+                self.skipped += 1
+
+        torch_profile = self._start_torch() if model and PROFILE_TORCH else None
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            if profile is not None:
+                profile.disable()
+            table = self._stop_torch(torch_profile)
+            name = getattr(getattr(fn, "func", fn), "__qualname__", repr(fn))
+            with self._lock:
+                self.calls.append({"call": name, "ms": round(elapsed_ms, 2), "model": model})
+                if profile is not None:
+                    self._profiles.append(profile)
+                if table:
+                    self._torch_tables.append(f"== {name} ({elapsed_ms:.1f} ms) ==\n{table}")
+
+    def _start_torch(self):
+        try:
+            import torch.profiler
+        except ImportError:
+            return None
+        if not _torch_lock.acquire(blocking=False):
+            return None
+        try:
+            torch_profile = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+            )
+            torch_profile.__enter__()
+            return torch_profile
+        except Exception as e:
+            _torch_lock.release()
+            print(f"⚠️ torch profiler not started: {e}")
+            return None
+
+    def _stop_torch(self, torch_profile):
+        if torch_profile is None:
+            return None
+        try:
+            torch_profile.__exit__(None, None, None)
+            events = torch_profile.key_averages()
+            if not len(events):
+                return None
+            return events.table(sort_by="self_cpu_time_total", row_limit=PROFILE_TOP_N)
+        except Exception as e:
+            print(f"⚠️ torch profiler failed: {e}")
+            return None
+        finally:
+            _torch_lock.release()
+
+    def _top_functions(self, stats, sort_key):
+        stats.sort_stats(sort_key)
+        top = []
+        for func in stats.fcn_list[:PROFILE_TOP_N]:
+            calls, ncalls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, function = func
+            top.append(
+                {
+                    "function": f"{function} ({os.path.basename(filename)}:{line})",
+                    "calls": ncalls,
+                    "tottime_ms": round(tottime * 1000.0, 2),
+                    "cumtime_ms": round(cumtime * 1000.0, 2),
+                }
+            )
+        return top
+
+    def finish(self, timings_ms=None, outcome=None):
+        """Write the capture files and return the summary."""
+        os.makedirs(self.directory, exist_ok=True)
+        summary = {
+            "capture_id": self.capture_id,
+            "session_id": self.session_id,
+            "turn_id": self.turn_id,
+            "started_at": self.started_at,
+            "outcome": outcome,
+            "timings_ms": timings_ms or {},
+            "executor_calls": self.calls,
+            "unprofiled_calls": self.skipped,
+            "files": [],
+        }
+        if self._profiles:
+            stats = pstats.Stats(self._profiles[0], stream=io.StringIO())
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.join(self.directory, "python.prof"))
+            summary["top_cumulative"] = self._top_functions(stats, "cumulative")
+            summary["top_self"] = self._top_functions(stats, "tottime")
+            summary["files"].append("python.prof")
+        if self._torch_tables:
+            with open(os.path.join(self.directory, "torch_ops.txt"), "w", encoding="utf-8") as f:
+                f.write("\n\n".join(self._torch_tables))
+            summary["files"].append("torch_ops.txt")
+        summary["files"].append("summary.json")
+        with open(os.path.join(self.directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"[PROFILE] capture {self.capture_id} written ({len(self.calls)} calls)")
+        return summary
+
+
+class Profiler:
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._global_turns = 0
+        self._session_turns = {}
+        self._lock = threading.Lock()
+
+    def arm(self, turns, session_id=None):
+        """Profile the next `turns` turns (of one session, or of any session)."""
+        if isinstance(turns, bool) or not isinstance(turns, int) or turns < 0:
+            raise ValueError("turns must be a non-negative integer")
+        with self._lock:
+            if session_id:
+                if turns:
+                    self._session_turns[session_id] = turns
+                else:
+                    self._session_turns.pop(session_id, None)
+            else:
+                self._global_turns = turns
+        return self.status()
+
+    def disarm(self):
+        with self._lock:
+            self._global_turns = 0
+            self._session_turns.clear()
+        return self.status()
+
+    def claim(self, session_id, turn_id=None):
+        """ProfileCapture if this turn should be profiled, else None."""
+        if not self._global_turns and not self._session_turns:
+            return None
+        with self._lock:
+            remaining = self._session_turns.get(session_id)
+            if remaining:
+                if remaining == 1:
+                    del self._session_turns[session_id]
+                else:
+                    self._session_turns[session_id] = remaining - 1
+            elif self._global_turns:
+                self._global_turns -= 1
+            else:
+                return None
+        return ProfileCapture(self.directory, session_id, turn_id)
+
+    def finish(self, capture, timings_ms=None, outcome=None):
+        summary = capture.finish(timings_ms, outcome)
+        self._prune()
+        return summary
+
+    def _prune(self):
+        captures = self.captures()
+        for capture_id in captures[self.keep :]:
+            shutil.rmtree(os.path.join(self.directory, capture_id), ignore_errors=True)
+
+    def captures(self):
+        """Capture ids, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (
+                name
+                for name in os.listdir(self.directory)
+                if os.path.isfile(os.path.join(self.directory, name, "summary.json"))
+            ),
+            reverse=True,
+        )
+
+    def file_path(self, capture_id, filename):
+        """Path of a capture file, or None (also for ids that try to leave the directory)."""
+        if filename not in PROFILE_FILES or capture_id not in self.captures():
+            return None
+        path = os.path.join(self.directory, capture_id, filename)
+        return path if os.path.isfile(path) else None
+
+    def summary(self, capture_id):
+        path = self.file_path(capture_id, "summary.json")
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def status(self):
+        with self._lock:
+            return {
+                "global_turns": self._global_turns,
+                "session_turns": dict(self._session_turns),
+                "torch": PROFILE_TORCH,
+            }
+
+
+profiler = Profiler()
@@ -1,76 +1,414 @@
-import base64
-import queue
+import os
 import threading
 import time
 from datetime import datetime
-import speech_recognition as sr
-import tempfile
-import os
-import whisper
 from ai.speech_translation import translate_json_list
+from ai.audio_decode import TARGET_SAMPLE_RATE, decode_audio_base64, decode_audio_bytes
+from ai.batching import MicroBatcher
+from ai.emotion_runtime import load_emotion_classifier, softmax
+from ai.model_registry import model_registry
+from ai.vad import apply_vad
+from executors import MODEL_EXECUTOR, get_model_pool
 import warnings
-import torch
-import librosa
-from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
+import numpy as np
 
 warnings.filterwarnings(
     "ignore", message="FP16 is not supported on CPU; using FP32 instead"
 )
 
 # -------------------------------
-# Load Models Once
+# Models (loaded once, on first use or by the startup warm-up)
 # -------------------------------
-whisper_model = whisper.load_model("base")
-emotion_model_name = "superb/wav2vec2-base-superb-er"
-emotion_extractor = AutoFeatureExtractor.from_pretrained(emotion_model_name)
-emotion_model = AutoModelForAudioClassification.from_pretrained(emotion_model_name)
+# torch / transformers / whisper are imported inside the loaders, so importing
+# this module (and main.py) does not pay for them.
+#
+# ASR backends (same result contract, picked per deployment):
+#   ASR_BACKEND=openai-whisper (default) → openai-whisper, FP32 PyTorch
+#   ASR_BACKEND=faster-whisper           → CTranslate2, int8 weights on CPU
+ASR_BACKEND = os.getenv("ASR_BACKEND", "openai-whisper").lower()
+ASR_MODEL_SIZE = os.getenv("ASR_MODEL_SIZE", "base")
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")
+ASR_CPU_THREADS = int(os.getenv("ASR_CPU_THREADS", "0"))  # 0 = library default
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))  # greedy, like openai-whisper
+
+
+class OpenAIWhisperBackend:
+    name = "openai-whisper"
+
+    def __init__(self, model_size=ASR_MODEL_SIZE):
+        import whisper
+
+        self._whisper = whisper
+        self.model = whisper.load_model(model_size)
+
+    def detect_language(self, audio):
+        whisper = self._whisper
+        mel = whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels
+        ).to(self.model.device)
+        _, probs = self.model.detect_language(mel)
+        language = max(probs, key=probs.get)
+        return language, float(probs[language])
+
+    def transcribe(self, audio, language):
+        result = self.model.transcribe(audio, language=language)
+        segments = result.get("segments") or []
+        return {
+            "language": result.get("language", language),
+            "text": result.get("text", "").strip(),
+            "avg_logprob": _avg_logprob([seg["avg_logprob"] for seg in segments]),
+        }
+
+
+class FasterWhisperBackend:
+    name = "faster-whisper"
+
+    def __init__(
+        self,
+        model_size=ASR_MODEL_SIZE,
+        compute_type=ASR_COMPUTE_TYPE,
+        cpu_threads=ASR_CPU_THREADS,
+    ):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads
+        )
+
+    def detect_language(self, audio):
+        if hasattr(self.model, "detect_language"):
+            language, probability, _ = self.model.detect_language(audio)
+            return language, float(probability)
+        # older faster-whisper: language ID only comes out of transcribe()
+        _, info = self.model.transcribe(audio, beam_size=1, without_timestamps=True)
+        return info.language, float(info.language_probability)
+
+    def transcribe(self, audio, language):
+        segments, info = self.model.transcribe(
+            audio, language=language, beam_size=ASR_BEAM_SIZE
+        )
+        segments = list(segments)  # decoding happens while iterating
+        return {
+            "language": info.language or language,
+            "text": "".join(seg.text for seg in segments).strip(),
+            "avg_logprob": _avg_logprob([seg.avg_logprob for seg in segments]),
+        }
+
+
+_ASR_BACKENDS = {
+    "openai-whisper": OpenAIWhisperBackend,
+    "faster-whisper": FasterWhisperBackend,
+}
+
+
+def _load_whisper():
+    if ASR_BACKEND not in _ASR_BACKENDS:
+        raise ValueError(
+            f"Unknown ASR_BACKEND '{ASR_BACKEND}' (choose from {sorted(_ASR_BACKENDS)})"
+        )
+    return _ASR_BACKENDS[ASR_BACKEND]()
+
+
+def _warmup_whisper(backend):
+    backend.transcribe(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32), "en")
+
+
+def _load_emotion():
+    # EMOTION_MODEL_MODE picks fp32 / int8 / onnx / onnx-int8 (ai/emotion_runtime.py)
+    return load_emotion_classifier()
+
+
+def _warmup_emotion(classifier):
+    detect_emotion_from_audio(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32))
+
+
+model_registry.register("whisper", _load_whisper, warmup=_warmup_whisper)
+model_registry.register("emotion", _load_emotion, warmup=_warmup_emotion)
+
+
+def get_asr_backend():
+    """→ OpenAIWhisperBackend | FasterWhisperBackend, per ASR_BACKEND"""
+    return model_registry.get("whisper")
+
+
+def get_emotion_model():
+    """→ emotion classifier (.extractor, .logits(), .id2label) for EMOTION_MODEL_MODE"""
+    return model_registry.get("emotion")
 
 
 # -------------------------------
 # Emotion Detection Function
 # -------------------------------
-def detect_emotion_from_audio(wav_path: str):
+# wav2vec2 self-attention memory grows with the square of the clip length, so
+# clips longer than EMOTION_WINDOW_S are split into fixed windows (EMOTION_HOP_S
+# apart, the last one aligned to the end). At most EMOTION_WINDOW_BATCH windows
+# go through one forward pass, which bounds peak memory whatever the turn length.
+# Window probabilities are averaged into the usual emotion / scores, and the
+# per-window results form a time-aligned timeline.
+EMOTION_WINDOW_S = float(os.getenv("EMOTION_WINDOW_S", "4.0"))
+EMOTION_HOP_S = float(os.getenv("EMOTION_HOP_S", "2.0"))
+EMOTION_WINDOW_BATCH = int(os.getenv("EMOTION_WINDOW_BATCH", "8"))
+
+
+def window_starts(n_samples, window, hop):
+    """Start offsets covering [0, n_samples); the last window ends at n_samples."""
+    if n_samples <= window:
+        return [0]
+    starts = list(range(0, n_samples - window + 1, hop))
+    if starts[-1] + window < n_samples:
+        starts.append(n_samples - window)
+    return starts
+
+
+def _emotion_probs(speeches):
     """
-    Returns: {"emotion": str, "scores": dict}
+    One forward pass (zero-padded when lengths differ) → (probs [n, labels], id2label).
+    No attention_mask: wav2vec2-base expects zero-padded input_values without one.
     """
-    speech, sr = librosa.load(wav_path, sr=16000)
-    inputs = emotion_extractor(speech, sampling_rate=16000, return_tensors="pt")
-
-    with torch.no_grad():
-        logits = emotion_model(**inputs).logits
-        probs = torch.nn.functional.softmax(logits, dim=-1)[0]
-        pred_id = torch.argmax(probs).item()
-
-    label = emotion_model.config.id2label[pred_id]
-    scores = {
-        emotion_model.config.id2label[i]: round(float(probs[i]), 4)
-        for i in range(len(probs))
+    classifier = get_emotion_model()
+    if len(speeches) == 1:
+        inputs = classifier.extractor(
+            speeches[0], sampling_rate=TARGET_SAMPLE_RATE, return_tensors="np"
+        )
+        logits = classifier.logits(inputs["input_values"])
+    else:
+        inputs = classifier.extractor(
+            speeches,
+            sampling_rate=TARGET_SAMPLE_RATE,
+            padding=True,
+            return_attention_mask=False,
+            return_tensors="np",
+        )
+        logits = classifier.logits(inputs["input_values"])
+    return softmax(logits), classifier.id2label
+
+
+def _emotion_result(probs, id2label):
+    return {
+        "emotion": id2label[int(np.argmax(probs))],
+        "scores": {id2label[i]: round(float(probs[i]), 4) for i in range(len(probs))},
     }
-    return {"emotion": label, "scores": scores}
+
+
+def detect_emotion_from_audio(audio):
+    """
+    audio: 16 kHz mono float32 array (or a path to an audio file)
+    Returns: {"emotion": str, "scores": dict, "timeline": list}
+    """
+    if isinstance(audio, str):
+        import librosa
+
+        speech, _ = librosa.load(audio, sr=TARGET_SAMPLE_RATE)
+    else:
+        speech = audio
+    return classify_emotion_batch([speech])[0]
+
+
+# -------------------------------
+# Batched Emotion Detection (cross-session)
+# -------------------------------
+# Off by default. Utterances almost never have equal lengths, and wav2vec2-base
+# cannot take padded batches without its scores shifting (below), so with the
+# default pad ratio the batcher mostly runs batches of one — behind a single
+# thread and an EMOTION_BATCH_WAIT_MS wait. The windows of one long clip share
+# forward passes either way (classify_emotion_batch).
+# Turn it on when many sessions send long clips at once (their windows all have
+# the same length and batch exactly), or together with a pad ratio > 1.0 when
+# throughput matters more than bit-identical scores. Compare with bench/run.py.
+EMOTION_BATCHING = os.getenv("EMOTION_BATCHING", "0") == "1"
+EMOTION_BATCH_MAX_SIZE = int(os.getenv("EMOTION_BATCH_MAX_SIZE", "8"))
+EMOTION_BATCH_WAIT_MS = float(os.getenv("EMOTION_BATCH_WAIT_MS", "10"))
+# wav2vec2-base uses a group-norm feature encoder, so zero padding shifts the
+# scores of the shorter clip. The default 1.0 only batches equal-length clips,
+# which gives the same results as unbatched inference. Windows of long clips all
+# have the same length, so they still share forward passes. A larger ratio
+# (e.g. 1.5) opts in to padded batching of similar lengths: more throughput,
+# slightly different scores.
+EMOTION_BATCH_MAX_PAD_RATIO = float(os.getenv("EMOTION_BATCH_MAX_PAD_RATIO", "1.0"))
+
+
+def _forward_grouped(pieces):
+    """
+    pieces: list of arrays. Groups similar lengths (sorted, split by
+    EMOTION_BATCH_MAX_PAD_RATIO and EMOTION_WINDOW_BATCH) → probs in input order.
+    """
+    order = sorted(range(len(pieces)), key=lambda i: len(pieces[i]))
+    probs = [None] * len(pieces)
+    id2label = None
+
+    group = []
+    for i in order + [None]:
+        if group and (
+            i is None
+            or len(group) >= EMOTION_WINDOW_BATCH
+            or len(pieces[i]) > max(len(pieces[group[0]]), 1) * EMOTION_BATCH_MAX_PAD_RATIO
+        ):
+            group_probs, id2label = _emotion_probs([pieces[j] for j in group])
+            for j, row in zip(group, group_probs):
+                probs[j] = row
+            group = []
+        if i is not None:
+            group.append(i)
+
+    return probs, id2label
+
+
+def classify_emotion_batch(speeches):
+    """
+    speeches: list of 16 kHz mono float32 arrays from any number of sessions.
+    Long clips are cut into windows; windows and short clips from every session
+    share forward passes. Returns {"emotion", "scores", "timeline"} in input order.
+    """
+    window = int(EMOTION_WINDOW_S * TARGET_SAMPLE_RATE)
+    hop = max(int(EMOTION_HOP_S * TARGET_SAMPLE_RATE), 1)
+
+    pieces, spans = [], []  # spans[i] = [(piece index, start, end)] for speeches[i]
+    for speech in speeches:
+        span = []
+        for start in window_starts(len(speech), window, hop):
+            end = min(start + window, len(speech))
+            span.append((len(pieces), start, end))
+            pieces.append(speech[start:end])
+        spans.append(span)
+
+    probs, id2label = _forward_grouped(pieces)
+
+    results = []
+    for span in spans:
+        window_probs = np.stack([probs[k] for k, _, _ in span])
+        result = _emotion_result(window_probs.mean(axis=0), id2label)
+        result["timeline"] = [
+            {
+                "start": round(start / TARGET_SAMPLE_RATE, 2),
+                "end": round(end / TARGET_SAMPLE_RATE, 2),
+                **_emotion_result(probs[k], id2label),
+            }
+            for k, start, end in span
+        ]
+        results.append(result)
+    return results
+
+
+def _classify_batch_on_model_pool(speeches):
+    """Batcher callback: in process mode the batch runs in a worker, not the parent."""
+    if MODEL_EXECUTOR == "process":
+        return get_model_pool().submit(classify_emotion_batch, speeches).result()
+    return classify_emotion_batch(speeches)
+
+
+emotion_batcher = MicroBatcher(
+    _classify_batch_on_model_pool,
+    max_batch_size=EMOTION_BATCH_MAX_SIZE,
+    max_wait_ms=EMOTION_BATCH_WAIT_MS,
+    name="emotion-batcher",
+)
+
+
+def submit_emotion(audio: np.ndarray):
+    """
+    Start emotion classification without waiting for it.
+    Returns a concurrent.futures.Future of {"emotion", "scores"}.
+    Unbatched calls run on the shared model pool (MODEL_EXECUTOR / MODEL_WORKERS).
+    """
+    if EMOTION_BATCHING:
+        return emotion_batcher.submit(audio)
+    return get_model_pool().submit(detect_emotion_from_audio, audio)
 
 
 # -------------------------------
 # Whisper Transcription + Language
 # -------------------------------
-def detect_language_and_transcribe_from_base64(audio_b64: str):
-    """Decode base64 WAV, transcribe, detect language."""
-    audio_bytes = base64.b64decode(audio_b64)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
-        temp_wav.write(audio_bytes)
-        temp_path = temp_wav.name
+# a pinned language is re-checked when Whisper's own decoding confidence drops
+LANG_PIN_MIN_LOGPROB = float(os.getenv("LANG_PIN_MIN_LOGPROB", "-1.0"))
 
-    try:
-        result = whisper_model.transcribe(temp_path)
-        emotion_result = detect_emotion_from_audio(temp_path)
-    finally:
-        os.remove(temp_path)
 
-    language = result.get("language", "unknown")
-    text = result.get("text", "").strip()
-    emotion = emotion_result["emotion"]
-    scores = emotion_result["scores"]
+def _avg_logprob(segment_logprobs):
+    if not segment_logprobs:
+        return None
+    return sum(segment_logprobs) / len(segment_logprobs)
 
-    return {"language": language, "text": text, "emotion": emotion, "scores": scores}
+
+def detect_spoken_language(audio: np.ndarray):
+    """Whisper language ID on the first 30 s. Returns (lang, probability)."""
+    return get_asr_backend().detect_language(audio)
+
+
+def transcribe_audio(audio: np.ndarray, language: str | None = None):
+    """
+    Whisper (ASR_BACKEND) on an in-memory 16 kHz mono float32 array.
+
+    language: optional hint (e.g. the speaker's language from earlier turns).
+              Skips Whisper's language detection; if the pinned decode looks
+              wrong (avg_logprob < LANG_PIN_MIN_LOGPROB), detection is re-run.
+    Returns: {"language", "text", "language_detected", "language_probability",
+              "language_redetected", "avg_logprob"}
+    """
+    backend = get_asr_backend()
+    redetected = False
+    if language:
+        result = backend.transcribe(audio, language)
+        avg_logprob = result["avg_logprob"]
+        if avg_logprob is None or avg_logprob >= LANG_PIN_MIN_LOGPROB:
+            return {
+                "language": language,
+                "text": result["text"],
+                "language_detected": False,
+                "language_probability": None,
+                "language_redetected": False,
+                "avg_logprob": avg_logprob,
+            }
+        redetected = True
+
+    detected, probability = backend.detect_language(audio)
+    result = backend.transcribe(audio, detected)
+    return {
+        "language": result["language"] or detected,
+        "text": result["text"],
+        "language_detected": True,
+        "language_probability": probability,
+        "language_redetected": redetected,
+        "avg_logprob": result["avg_logprob"],
+    }
+
+
+def silence_result(vad_info):
+    """Fast response for all-silence input — no model is run."""
+    return {
+        "language": "unknown",
+        "text": "",
+        "emotion": "silence",
+        "scores": {},
+        "vad": vad_info,
+    }
+
+
+def detect_language_and_transcribe(audio: np.ndarray):
+    """Transcribe, detect language and emotion from one decoded array."""
+    # leading/trailing silence costs inference time on both models
+    audio, vad_info = apply_vad(audio)
+    if vad_info["is_silence"]:
+        return silence_result(vad_info)
+
+    # emotion runs alongside Whisper — they only share the input audio
+    emotion_future = submit_emotion(audio)
+    result = transcribe_audio(audio)
+    emotion_result = emotion_future.result()
+
+    return {
+        "language": result["language"],
+        "text": result["text"],
+        "emotion": emotion_result["emotion"],
+        "scores": emotion_result["scores"],
+        "vad": vad_info,
+    }
+
+
+def detect_language_and_transcribe_from_base64(
+    audio_b64: str, audio_format: str | None = None
+):
+    """Decode base64 audio in memory, transcribe, detect language."""
+    audio = decode_audio_base64(audio_b64, audio_format)
+    return detect_language_and_transcribe(audio)
 
 
 # -------------------------------
@@ -81,6 +419,8 @@ def live_turn_taking_recognition():
     Real-time microphone recognition with Whisper-based language detection + Emotion detection.
     Detects turns based on silence and alternates speakers automatically.
     """
+    import speech_recognition as sr
+
     r = sr.Recognizer()
 
     try:
@@ -115,20 +455,11 @@ def live_turn_taking_recognition():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
             try:
-                # Convert AudioData → WAV → base64
-                with tempfile.NamedTemporaryFile(
-                    delete=False, suffix=".wav"
-                ) as temp_audio:
-                    temp_audio.write(audio.get_wav_data())
-                    temp_audio_path = temp_audio.name
-
-                with open(temp_audio_path, "rb") as f:
-                    audio_b64 = base64.b64encode(f.read()).decode("utf-8")
-
-                os.remove(temp_audio_path)
+                # AudioData → WAV bytes → 16kHz float32 (in memory)
+                samples = decode_audio_bytes(audio.get_wav_data())
 
                 # Run Whisper + Emotion
-                result = detect_language_and_transcribe_from_base64(audio_b64)
+                result = detect_language_and_transcribe(samples)
                 lang, text, emotion, scores = (
                     result["language"],
                     result["text"],
@@ -1,41 +1,203 @@
 import os
+import io
+import gc
 import base64
-from pathlib import Path
-from TTS.api import TTS
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+# -------------------------------
+# Local (Coqui) TTS model pool
+# -------------------------------
+# Voices are loaded per language on first use instead of at import. Loaded voices
+# are kept in LRU order and the least recently used idle voice is unloaded when
+# loading another one would go over TTS_LOCAL_MEMORY_MB. Each voice has its own
+# lock (Coqui models are not safe to call from two threads at once), and audio is
+# synthesized straight into a numpy array — nothing is written to disk.
+
+TTS_LOCAL_MEMORY_MB = float(os.getenv("TTS_LOCAL_MEMORY_MB", "1500"))
+_MB = 1024 * 1024
+
+# same languages as LANG_MAP in main.py; override with TTS_LOCAL_MODEL_<LANG>
+DEFAULT_LOCAL_TTS_MODELS = {
+    "ko": "tts_models/kr/glow-tts/korean_university-1.0",
+    "en": "tts_models/en/ljspeech/glow-tts",
+    "ja": "tts_models/ja/kokoro/tacotron2-DDC",
+    "zh": "tts_models/zh-CN/baker/tacotron2-DDC-GST",
+    "es": "tts_models/es/mai/tacotron2-DDC",
+}
+LOCAL_TTS_MODELS = {
+    lang: os.getenv(f"TTS_LOCAL_MODEL_{lang.upper()}", name)
+    for lang, name in DEFAULT_LOCAL_TTS_MODELS.items()
+}
+
+
+def _normalize_lang(lang):
+    """'ko-KR' → 'ko', 'zh-CN' → 'zh'; unsupported → 'en'."""
+    lang = (lang or "en").lower()[:2]
+    if lang == "kr":
+        lang = "ko"
+    return lang if lang in LOCAL_TTS_MODELS else "en"
+
+
+def _model_bytes(tts):
+    """Parameter + buffer memory of the loaded acoustic model and vocoder."""
+    total = 0
+    synthesizer = getattr(tts, "synthesizer", None)
+    for name in ("tts_model", "vocoder_model"):
+        module = getattr(synthesizer, name, None)
+        if module is None:
+            continue
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class _Voice:
+    def __init__(self, lang, model_name, tts, memory_bytes):
+        self.lang = lang
+        self.model_name = model_name
+        self.tts = tts
+        self.memory_bytes = memory_bytes
+        self.sample_rate = tts.synthesizer.output_sample_rate
+        self.lock = threading.Lock()  # one synthesis at a time per model
+        self.in_use = 0
+
+
+class TtsModelPool:
+    def __init__(self, models=None, memory_budget_mb=TTS_LOCAL_MEMORY_MB):
+        self.models = dict(models or LOCAL_TTS_MODELS)
+        self.memory_budget = int(memory_budget_mb * _MB)
+        self._voices = OrderedDict()  # lang → _Voice, least recently used first
+        self._lock = threading.Lock()
+        self._load_locks = {lang: threading.Lock() for lang in self.models}
+        self.loads = 0
+        self.evictions = 0
+
+    def _load(self, lang):
+        from TTS.api import TTS
+
+        model_name = self.models[lang]
+        t0 = time.perf_counter()
+        tts = TTS(model_name=model_name, progress_bar=False)
+        voice = _Voice(lang, model_name, tts, _model_bytes(tts))
+        print(
+            f"[TTS] loaded {lang} voice {model_name} "
+            f"({voice.memory_bytes / _MB:.0f} MB, {time.perf_counter() - t0:.1f}s)"
+        )
+        return voice
+
+    def _evict_for(self, incoming_bytes):
+        """Unload idle voices (LRU first) until incoming_bytes fits. Needs self._lock."""
+        used = sum(v.memory_bytes for v in self._voices.values())
+        for lang in list(self._voices):
+            if used + incoming_bytes <= self.memory_budget:
+                break
+            voice = self._voices[lang]
+            if voice.in_use:
+                continue
+            del self._voices[lang]
+            used -= voice.memory_bytes
+            self.evictions += 1
+            print(f"[TTS] unloaded {lang} voice {voice.model_name}")
+            gc.collect()
+
+    def acquire(self, lang) -> _Voice:
+        """Loaded voice for lang, marked in use until release()."""
+        lang = _normalize_lang(lang)
+        with self._lock:
+            voice = self._voices.get(lang)
+            if voice is not None:
+                self._voices.move_to_end(lang)
+                voice.in_use += 1
+                return voice
+
+        # load outside the pool lock so other languages keep serving
+        with self._load_locks[lang]:
+            with self._lock:
+                voice = self._voices.get(lang)
+                if voice is not None:
+                    self._voices.move_to_end(lang)
+                    voice.in_use += 1
+                    return voice
+            voice = self._load(lang)
+            self.loads += 1
+            with self._lock:
+                self._evict_for(voice.memory_bytes)
+                self._voices[lang] = voice
+                voice.in_use += 1
+                return voice
+
+    def release(self, voice):
+        with self._lock:
+            voice.in_use -= 1
+            # voices that were busy during the last load may now be over budget
+            if sum(v.memory_bytes for v in self._voices.values()) > self.memory_budget:
+                self._evict_for(0)
+
+    def synthesize(self, text, lang="ko"):
+        """→ (float32 samples, sample_rate), all in memory."""
+        voice = self.acquire(lang)
+        try:
+            with voice.lock:
+                samples = voice.tts.tts(text=text)
+            return np.asarray(samples, dtype=np.float32), voice.sample_rate
+        finally:
+            self.release(voice)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": {
+                    lang: {
+                        "model": v.model_name,
+                        "memory_mb": round(v.memory_bytes / _MB, 1),
+                        "in_use": v.in_use,
+                    }
+                    for lang, v in self._voices.items()
+                },
+                "memory_mb": round(
+                    sum(v.memory_bytes for v in self._voices.values()) / _MB, 1
+                ),
+                "budget_mb": round(self.memory_budget / _MB, 1),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+def encode_wav(samples, sample_rate) -> bytes:
+    """float32 [-1, 1] → 16-bit PCM WAV bytes (in memory)."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+tts_model_pool = TtsModelPool()
 
-# Initialize TTS models (they will be downloaded on first run)
-# Using specific model names that are known to exist
-tts_kr = TTS(model_name="tts_models/kr/glow-tts/korean_university-1.0", progress_bar=False)
-tts_en = TTS(model_name="tts_models/en/ljspeech/glow-tts", progress_bar=False)
 
 def text_to_speech(text, lang="ko"):
     """
     Convert text to speech using Coqui TTS and return base64 encoded audio
-    
+
     Args:
         text (str): Text to convert to speech
-        lang (str): Language code ('ko' or 'en')
-    
+        lang (str): Language code (any LANG_MAP language: ko, en, ja, zh, es)
+
     Returns:
         dict: Contains base64 encoded audio and metadata
     """
     try:
-        # Select appropriate TTS model
-        tts = tts_kr if lang.lower().startswith("ko") else tts_en
-        
-        # Generate unique filename
-        output_path = f"tts_output_{hash(text)}.wav"
-        
-        # Generate speech
-        tts.tts_to_file(text=text, file_path=output_path)
-        
-        # Read the generated audio file and encode to base64
-        with open(output_path, "rb") as audio_file:
-            audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
-            
-        # Clean up the temporary file
-        os.remove(output_path)
-        
+        samples, sample_rate = tts_model_pool.synthesize(text, lang)
+        audio_base64 = base64.b64encode(encode_wav(samples, sample_rate)).decode('utf-8')
+
         return {
             "status": "success",
             "audio": audio_base64,
@@ -43,11 +205,11 @@ def text_to_speech(text, lang="ko"):
             "lang": lang,
             "text": text
         }
-        
+
     except Exception as e:
         return {
             "status": "error",
             "message": str(e),
             "lang": lang,
             "text": text
-        }
\ No newline at end of file
+        }
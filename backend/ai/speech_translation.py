@@ -1,45 +1,64 @@
-from googletrans import Translator
 from datetime import datetime
+from ai.translation_cache import translation_cache
+from ai.translation_backends import (
+    TRANSLATION_BULK_BACKEND,
+    get_translation_backend,
+)
 
-# Initialize translator
-translator = Translator()
 
-def translate_json_list(json_list, target_lang):
+def translate_json_list(json_list, target_lang, bulk=None, backend=None):
     """
     Translates a list of recognized speech JSON objects into another language.
 
     Args:
         json_list (list): [{"timestamp": "20251010_153045", "text": "hello my name is kevin"}, ...]
+                          an optional "lang" per item is used as the source language
         target_lang (str): Target translation language (e.g. 'ko', 'es', 'fr')
+        bulk (bool): use TRANSLATION_BULK_BACKEND (concurrent, dedup + retries)
+                     instead of TRANSLATION_BACKEND (default: on for more than one item)
+        backend (str): force a backend by name ("googletrans", "http", "local")
 
     Returns:
         list: [{"timestamp": "...", "original_text": "...", "translated_text": "..."}]
     """
-    translated_results = []
+    if bulk is None:
+        bulk = len(json_list) > 1
+    if backend is None and bulk:
+        backend = TRANSLATION_BULK_BACKEND
+    translator = get_translation_backend(backend)
 
-    for item in json_list:
-        original_text = item.get("text", "")
-        timestamp = item.get("timestamp") or datetime.now().strftime("%Y%m%d_%H%M%S")
+    translated = [None] * len(json_list)
+    misses = {}  # source_lang → [index, ...]
+
+    for i, item in enumerate(json_list):
+        # Repeated phrases ("thank you", "yes", ...) skip the backend entirely
+        cached = translation_cache.get(item.get("lang"), target_lang, item.get("text", ""))
+        if cached is not None:
+            translated[i] = cached
+        else:
+            misses.setdefault(item.get("lang"), []).append(i)
 
-        try:
-            # Translate using Google Translate API
-            translated = translator.translate(original_text, dest=target_lang)
-
-            translated_results.append({
-                "timestamp": timestamp,
-                "original_text": original_text,
-                "translated_text": translated.text
-            })
-
-            print(f"[{timestamp}] {original_text} → {translated.text}")
-
-        except Exception as e:
-            print(f"⚠️ Translation error for '{original_text}': {e}")
-            translated_results.append({
-                "timestamp": timestamp,
-                "original_text": original_text,
-                "translated_text": None
-            })
+    for source_lang, indexes in misses.items():
+        texts = [json_list[i].get("text", "") for i in indexes]
+        unique = list(dict.fromkeys(texts))  # identical texts are translated once
+        results = dict(
+            zip(unique, translator.translate_batch(unique, target_lang, source_lang))
+        )
+        for i, text in zip(indexes, texts):
+            translated[i] = results[text]
+        for text, result in results.items():
+            translation_cache.put(source_lang, target_lang, text, result)
+
+    translated_results = []
+    for item, result in zip(json_list, translated):
+        timestamp = item.get("timestamp") or datetime.now().strftime("%Y%m%d_%H%M%S")
+        translated_results.append({
+            "timestamp": timestamp,
+            "original_text": item.get("text", ""),
+            "translated_text": result
+        })
+        if not bulk:
+            print(f"[{timestamp}] {item.get('text', '')} → {result}")
 
     return translated_results
 
@@ -1,26 +1,24 @@
-import sounddevice as sd
 import numpy as np
-from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
-import torch
 
-model_name = "superb/wav2vec2-base-superb-er"
-extractor = AutoFeatureExtractor.from_pretrained(model_name)
-model = AutoModelForAudioClassification.from_pretrained(model_name)
+from ai.speech_detection import get_emotion_model
 
 
 def predict_emotion(audio_data, sr=16000):
-    inputs = extractor(audio_data, sampling_rate=sr, return_tensors="pt")
-    with torch.no_grad():
-        logits = model(**inputs).logits
-    pred_id = torch.argmax(logits, dim=-1).item()
-    return model.config.id2label[pred_id]
+    # wav2vec2 감정 모델은 speech_detection 과 같은 인스턴스를 공유 (model registry)
+    classifier = get_emotion_model()
+    inputs = classifier.extractor(audio_data, sampling_rate=sr, return_tensors="np")
+    logits = classifier.logits(inputs["input_values"])
+    return classifier.id2label[int(np.argmax(logits, axis=-1)[0])]
 
 
-duration = 3
-print("🎙️ 말하세요...")
+if __name__ == "__main__":
+    import sounddevice as sd
 
-audio = sd.rec(int(duration * 16000), samplerate=16000, channels=1, dtype="float32")
-sd.wait()
+    duration = 3
+    print("🎙️ 말하세요...")
 
-emotion = predict_emotion(np.squeeze(audio))
-print("예측된 감정:", emotion)
+    audio = sd.rec(int(duration * 16000), samplerate=16000, channels=1, dtype="float32")
+    sd.wait()
+
+    emotion = predict_emotion(np.squeeze(audio))
+    print("예측된 감정:", emotion)
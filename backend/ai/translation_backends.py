@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+from ai.batching import MicroBatcher
+from ai.translation_client import http_translate_client
+
+# -------------------------------
+# Translation backends
+# -------------------------------
+#   TRANSLATION_BACKEND=googletrans (default) → googletrans, one call per item
+#   TRANSLATION_BACKEND=http                  → pooled concurrent HTTP client
+#   TRANSLATION_BACKEND=local                 → on-box seq2seq model (air-gapped sites)
+#
+# Every backend implements translate_batch(texts, target_lang, source_lang)
+# → list of str | None (None = that item failed), same order as texts.
+
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "googletrans").lower()
+# backend for bulk lists (CLI exports); defaults to the concurrent HTTP client
+# unless the deployment picked something other than googletrans
+TRANSLATION_BULK_BACKEND = os.getenv(
+    "TRANSLATION_BULK_BACKEND",
+    "http" if TRANSLATION_BACKEND == "googletrans" else TRANSLATION_BACKEND,
+).lower()
+
+TRANSLATION_LOCAL_MODEL = os.getenv("TRANSLATION_LOCAL_MODEL", "facebook/m2m100_418M")
+TRANSLATION_LOCAL_BATCH = int(os.getenv("TRANSLATION_LOCAL_BATCH", "16"))
+TRANSLATION_LOCAL_WAIT_MS = float(os.getenv("TRANSLATION_LOCAL_WAIT_MS", "10"))
+TRANSLATION_LOCAL_MAX_TOKENS = int(os.getenv("TRANSLATION_LOCAL_MAX_TOKENS", "200"))
+
+# same languages as LANG_MAP in main.py
+SUPPORTED_LANGS = ("ko", "en", "ja", "zh", "es")
+
+
+class TranslationBackend:
+    name = "base"
+
+    def translate_batch(self, texts, target_lang, source_lang=None):
+        raise NotImplementedError
+
+    def warmup(self):
+        """Load whatever the backend needs before the first request."""
+
+
+class GoogleTransBackend(TranslationBackend):
+    """The original remote path: googletrans, one request per item."""
+
+    name = "googletrans"
+
+    def __init__(self):
+        self._translator = None
+        self._lock = threading.Lock()
+
+    def warmup(self):
+        if self._translator is None:
+            with self._lock:
+                if self._translator is None:
+                    from googletrans import Translator
+
+                    self._translator = Translator()
+
+    def translate_batch(self, texts, target_lang, source_lang=None):
+        self.warmup()
+        results = []
+        for text in texts:
+            try:
+                results.append(self._translator.translate(text, dest=target_lang).text)
+            except Exception as e:
+                print(f"⚠️ Translation error for '{text}': {e}")
+                results.append(None)
+        return results
+
+
+class HttpTranslateBackend(TranslationBackend):
+    """Concurrent bulk client over pooled keep-alive connections."""
+
+    name = "http"
+
+    def __init__(self, client=None):
+        self.client = client or http_translate_client
+
+    def translate_batch(self, texts, target_lang, source_lang=None):
+        return self.client.translate_many(texts, target_lang, source_lang)
+
+
+class LocalSeq2SeqBackend(TranslationBackend):
+    """
+    On-box CPU translation with a many-to-many seq2seq model (M2M100 by default,
+    covers ko/en/ja/zh/es in one checkpoint). The model is loaded once; requests
+    from all sessions are micro-batched and every language pair in a batch runs
+    as one padded generate() call.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name=TRANSLATION_LOCAL_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+        self._batcher = MicroBatcher(
+            self._process,
+            max_batch_size=TRANSLATION_LOCAL_BATCH,
+            max_wait_ms=TRANSLATION_LOCAL_WAIT_MS,
+            name="translate-batcher",
+        )
+
+    def warmup(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    import torch
+                    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+                    tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+                    model.eval()
+                    self._torch = torch
+                    self._tokenizer = tokenizer
+                    self._model = model
+
+    def _generate(self, texts, source_lang, target_lang):
+        tokenizer = self._tokenizer
+        tokenizer.src_lang = source_lang
+        encoded = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+        with self._torch.no_grad():
+            generated = self._model.generate(
+                **encoded,
+                forced_bos_token_id=tokenizer.get_lang_id(target_lang),
+                max_new_tokens=TRANSLATION_LOCAL_MAX_TOKENS,
+            )
+        return tokenizer.batch_decode(generated, skip_special_tokens=True)
+
+    def _process(self, items):
+        """items: [(text, source_lang, target_lang)] → one generate() per pair."""
+        self.warmup()
+        results = [None] * len(items)
+        pairs = {}
+        for i, (_, source_lang, target_lang) in enumerate(items):
+            pairs.setdefault((source_lang, target_lang), []).append(i)
+
+        for (source_lang, target_lang), indexes in pairs.items():
+            if source_lang not in SUPPORTED_LANGS or target_lang not in SUPPORTED_LANGS:
+                continue  # unsupported pair → None for these items
+            try:
+                outputs = self._generate(
+                    [items[i][0] for i in indexes], source_lang, target_lang
+                )
+            except Exception as e:
+                print(f"⚠️ Local translation error ({source_lang}→{target_lang}): {e}")
+                continue
+            for i, text in zip(indexes, outputs):
+                results[i] = text
+        return results
+
+    def translate_batch(self, texts, target_lang, source_lang=None):
+        # the seq2seq model needs the source language; Whisper always provides it
+        source_lang = source_lang or "en"
+        futures = [
+            self._batcher.submit((text, source_lang, target_lang)) for text in texts
+        ]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        return self._batcher.stats()
+
+
+_BACKEND_FACTORIES = {
+    "googletrans": GoogleTransBackend,
+    "http": HttpTranslateBackend,
+    "local": LocalSeq2SeqBackend,
+}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_translation_backend(name=None) -> TranslationBackend:
+    """Singleton backend by name (default: TRANSLATION_BACKEND)."""
+    name = (name or TRANSLATION_BACKEND).lower()
+    if name not in _BACKEND_FACTORIES:
+        raise ValueError(
+            f"Unknown translation backend '{name}' (choose from {sorted(_BACKEND_FACTORIES)})"
+        )
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = _BACKEND_FACTORIES[name]()
+        return _backends[name]
+
+
+# -------------------------------
+# Side-by-side benchmark
+# -------------------------------
+def _bench_phrases(limit):
+    """Clinic phrases in ko/en/zh/ja from the symptom scenarios."""
+    from ai.build_symptom import SYMPTOM_SCENARIOS
+
+    by_lang = {"ko": [], "en": [], "zh": [], "ja": []}
+    for entries in SYMPTOM_SCENARIOS.values():
+        for ko, en, zh, ja in entries:
+            by_lang["ko"].append(ko)
+            by_lang["en"].append(en)
+            by_lang["zh"].append(zh)
+            by_lang["ja"].append(ja)
+    return {lang: phrases[:limit] for lang, phrases in by_lang.items()}
+
+
+def benchmark(backend_names, target_lang="en", limit=20):
+    phrases = _bench_phrases(limit)
+    report = {}
+    for name in backend_names:
+        backend = get_translation_backend(name)
+        t0 = time.perf_counter()
+        backend.warmup()
+        warmup_ms = (time.perf_counter() - t0) * 1000.0
+
+        pairs = {}
+        for source_lang, texts in phrases.items():
+            if source_lang == target_lang:
+                continue
+            t0 = time.perf_counter()
+            out = backend.translate_batch(texts, target_lang, source_lang)
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            pairs[f"{source_lang}->{target_lang}"] = {
+                "items": len(texts),
+                "total_ms": round(elapsed, 1),
+                "per_item_ms": round(elapsed / max(len(texts), 1), 2),
+                "failures": sum(1 for t in out if t is None),
+                "sample": [texts[0], out[0]] if texts else None,
+            }
+        report[name] = {"warmup_ms": round(warmup_ms, 1), "pairs": pairs}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare translation backends")
+    parser.add_argument("--backends", default="googletrans,http,local")
+    parser.add_argument("--target", default="en")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    result = benchmark(args.backends.split(","), args.target, args.limit)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# -------------------------------
+# Two-tier translation cache
+# -------------------------------
+# key = (source lang, target lang, normalized text)
+#   tier 1: in-memory LRU with TTL
+#   tier 2: optional SQLite file that survives restarts (TRANSLATION_CACHE_DB)
+#
+# Only the memory LRU is guarded by the lock. SQLite is read and written outside
+# it, through one connection per thread (WAL mode), so a slow disk lookup never
+# stalls memory hits on other threads.
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "86400"))
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "")
+TRANSLATION_CACHE_DB_TTL = float(os.getenv("TRANSLATION_CACHE_DB_TTL", str(30 * 86400)))
+
+
+def normalize_text(text: str) -> str:
+    """'  I have a  Headache ' → 'i have a headache' (NFKC, whitespace, case)."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split()).casefold()
+
+
+class TranslationCache:
+    def __init__(
+        self,
+        max_entries=TRANSLATION_CACHE_SIZE,
+        ttl=TRANSLATION_CACHE_TTL,
+        db_path=TRANSLATION_CACHE_DB,
+        db_ttl=TRANSLATION_CACHE_DB_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path = db_path or None
+        self._local = threading.local()
+        if self.db_path:
+            db = self._db()
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    text        TEXT NOT NULL,
+                    translated  TEXT NOT NULL,
+                    created_at  REAL NOT NULL,
+                    PRIMARY KEY (source_lang, target_lang, text)
+                )
+                """
+            )
+            db.commit()
+        self.reset_stats()
+
+    def _db(self):
+        """This thread's SQLite connection (opened on first use)."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=5.0)
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def key(source_lang, target_lang, text):
+        return (source_lang or "auto", target_lang or "", normalize_text(text))
+
+    def get(self, source_lang, target_lang, text):
+        key = self.key(source_lang, target_lang, text)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        row = None
+        if self.db_path:
+            row = self._db().execute(
+                "SELECT translated, created_at FROM translations "
+                "WHERE source_lang=? AND target_lang=? AND text=?",
+                key,
+            ).fetchone()
+
+        with self._lock:
+            if row is not None and row[1] + self.db_ttl >= now:
+                self.disk_hits += 1
+                self._remember(key, row[0], now)
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, source_lang, target_lang, text, translated):
+        if translated is None:
+            return  # never cache failures
+        key = self.key(source_lang, target_lang, text)
+        now = time.time()
+        with self._lock:
+            self._remember(key, translated, now)
+        if self.db_path:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                (*key, translated, now),
+            )
+            db.commit()
+
+    def _remember(self, key, value, now):
+        self._memory[key] = (value, now + self.ttl)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            db = self._db()
+            db.execute("DELETE FROM translations")
+            db.commit()
+
+    def reset_stats(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups
+                if lookups
+                else 0.0,
+                "persistent": self.db_path is not None,
+            }
+
+
+translation_cache = TranslationCache()
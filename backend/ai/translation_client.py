@@ -0,0 +1,125 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# -------------------------------
+# Pooled HTTP translation client (bulk mode)
+# -------------------------------
+# One requests.Session with a sized connection pool is shared by all worker
+# threads, so a batch reuses warm keep-alive connections instead of opening one
+# per item. The endpoint is configurable, so a local HTTP stand-in that answers
+# in the same format can replace Google in tests and benchmarks:
+#   GET {TRANSLATE_ENDPOINT}?client=gtx&sl=en&tl=ko&dt=t&q=hello
+#   → [[["안녕하세요", "hello", ...], ...], ...]
+
+TRANSLATE_ENDPOINT = os.getenv(
+    "TRANSLATE_ENDPOINT", "https://translate.googleapis.com/translate_a/single"
+)
+TRANSLATE_MAX_WORKERS = int(os.getenv("TRANSLATE_MAX_WORKERS", "8"))
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "5"))
+TRANSLATE_RETRIES = int(os.getenv("TRANSLATE_RETRIES", "3"))
+TRANSLATE_BACKOFF = float(os.getenv("TRANSLATE_BACKOFF", "0.25"))
+
+# Whisper / app codes → Google codes
+_GOOGLE_LANG = {"zh": "zh-CN"}
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TransientTranslationError(Exception):
+    """Retryable failure (timeout, connection reset, 429/5xx)."""
+
+
+class HttpTranslateClient:
+    def __init__(
+        self,
+        endpoint=TRANSLATE_ENDPOINT,
+        max_workers=TRANSLATE_MAX_WORKERS,
+        timeout=TRANSLATE_TIMEOUT,
+        retries=TRANSLATE_RETRIES,
+        backoff=TRANSLATE_BACKOFF,
+    ):
+        self.endpoint = endpoint
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._retry_lock = threading.Lock()
+        self.retry_count = 0
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="translate"
+                    )
+        return self._pool
+
+    def _request(self, text, target_lang, source_lang):
+        params = {
+            "client": "gtx",
+            "sl": _GOOGLE_LANG.get(source_lang, source_lang) or "auto",
+            "tl": _GOOGLE_LANG.get(target_lang, target_lang),
+            "dt": "t",
+            "q": text,
+        }
+        try:
+            resp = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientTranslationError(str(e)) from e
+        if resp.status_code in _RETRY_STATUS:
+            raise TransientTranslationError(f"HTTP {resp.status_code}")
+        resp.raise_for_status()
+
+        data = resp.json()
+        return "".join(seg[0] for seg in (data[0] or []) if seg and seg[0])
+
+    def translate(self, text, target_lang, source_lang=None):
+        """One item with exponential backoff (+ jitter) on transient failures."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self._request(text, target_lang, source_lang)
+            except TransientTranslationError:
+                if attempt == self.retries:
+                    raise
+                with self._retry_lock:
+                    self.retry_count += 1
+                delay = self.backoff * (2**attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+    def translate_many(self, texts, target_lang, source_lang=None):
+        """
+        Bulk mode: identical texts are sent once, unique texts go out
+        concurrently over the shared pool. Output order matches input order;
+        items that still fail after retries come back as None.
+        """
+        unique = list(dict.fromkeys(texts))
+
+        def one(text):
+            if not text:
+                return text
+            try:
+                return self.translate(text, target_lang, source_lang)
+            except Exception as e:
+                print(f"⚠️ Translation error for '{text}': {e}")
+                return None
+
+        translated = dict(zip(unique, self._executor().map(one, unique)))
+        return [translated[text] for text in texts]
+
+
+http_translate_client = HttpTranslateClient()
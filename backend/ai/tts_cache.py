@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# -------------------------------
+# Content-addressed TTS audio cache
+# -------------------------------
+# key = sha256(normalized text, resolved lang code, voice settings)
+#   tier 1: in-memory LRU bounded by total bytes
+#   tier 2: optional directory of <key>.mp3 files bounded by total size
+#           (least recently used files are deleted first), survives restarts
+#
+# Entries are the synthesized mp3 bytes exactly as gTTS produced them, so a hit
+# is served as-is.
+#
+# The lock only guards the in-memory index and counters; file reads, writes and
+# eviction walks happen outside it. Concurrent misses for the same key share one
+# synthesis (get_or_synthesize).
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "")
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "512"))
+TTS_CACHE_PREWARM = os.getenv("TTS_CACHE_PREWARM", "")
+
+
+def normalize_tts_text(text: str) -> str:
+    """NFKC + collapsed whitespace. Case is kept — it can change pronunciation."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split())
+
+
+def tts_key(text, lang_code, voice=None) -> str:
+    payload = json.dumps(
+        [normalize_tts_text(text), lang_code, voice or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TtsCache:
+    def __init__(
+        self,
+        memory_bytes=int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+        cache_dir=TTS_CACHE_DIR,
+        disk_bytes=int(TTS_CACHE_DISK_MB * 1024 * 1024),
+    ):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.cache_dir = cache_dir or None
+        self._memory = OrderedDict()  # key → audio bytes
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key → Future of the synthesis in progress
+        self._evicting = False
+        self._disk_size = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._disk_files())
+        self.reset_stats()
+
+    # ---- memory tier ----
+    def _remember(self, key, audio):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        if len(audio) > self.memory_bytes:
+            return
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.evictions += 1
+
+    # ---- disk tier ----
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".mp3")
+
+    def _disk_files(self):
+        """[(path, size, last used)] for every cached file."""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".mp3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((path, st.st_size, st.st_mtime))
+        return files
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mtime doubles as "last used" for eviction
+        except OSError:
+            pass
+        return audio
+
+    def _disk_put(self, key, audio):
+        """Called without the lock held."""
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+        with self._lock:
+            self._disk_size += len(audio)
+            evict = self._disk_size > self.disk_bytes and not self._evicting
+            if evict:
+                self._evicting = True
+                counted = self._disk_size
+        if evict:
+            try:
+                self._evict_disk(counted)
+            finally:
+                with self._lock:
+                    self._evicting = False
+
+    def _evict_disk(self, counted):
+        """Called without the lock held; one eviction walk at a time."""
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        # trim to 90% of the budget so eviction doesn't run on every put
+        target = self.disk_bytes * 0.9
+        removed = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            # resync with the walk, keeping what other puts added meanwhile
+            self._disk_size = total + max(0, self._disk_size - counted)
+            self.disk_evictions += removed
+
+    # ---- public ----
+    def get(self, key):
+        """mp3 bytes for key, or None."""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+        audio = self._disk_get(key) if self.cache_dir else None
+        with self._lock:
+            if audio is not None:
+                self.disk_hits += 1
+                self._remember(key, audio)
+                return audio
+            self.misses += 1
+            return None
+
+    def put(self, key, audio: bytes):
+        if not audio:
+            return
+        with self._lock:
+            self._remember(key, audio)
+        if self.cache_dir:
+            try:
+                self._disk_put(key, audio)
+            except OSError as e:
+                print(f"⚠️ TTS cache write failed: {e}")
+
+    def get_or_synthesize(self, key, synthesize):
+        """Cached audio, or synthesize() once — concurrent misses wait for that call."""
+        audio = self.get(key)
+        if audio is not None:
+            return audio
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:  # put() by another caller since our miss
+                return audio
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            audio = synthesize()
+            self.put(key, audio)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(audio)
+            return audio
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self.cache_dir:
+                for path, _, _ in self._disk_files():
+                    os.remove(path)
+                self._disk_size = 0
+
+    def reset_stats(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.coalesced = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "coalesced_misses": self.coalesced,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups
+                if lookups
+                else 0.0,
+                "persistent": self.cache_dir is not None,
+            }
+
+
+def load_prewarm_phrases(path):
+    """
+    Phrase list for pre-warming: one "lang<TAB>text" per line (lines without a
+    tab are read as English), or a JSON list of {"text", "lang"}.
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    if raw.lstrip().startswith("["):
+        return [(item["text"], item.get("lang", "en")) for item in json.loads(raw)]
+    phrases = []
+    for line in raw.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        lang, sep, text = line.partition("\t")
+        phrases.append((text, lang) if sep else (line, "en"))
+    return phrases
+
+
+def prewarm(phrases, synthesize):
+    """Synthesize every (text, lang) not cached yet. synthesize(text, lang) → bytes."""
+    t0 = time.perf_counter()
+    done = failed = 0
+    for text, lang in phrases:
+        try:
+            synthesize(text, lang)
+            done += 1
+        except Exception as e:
+            failed += 1
+            print(f"⚠️ TTS prewarm failed for '{text}' ({lang}): {e}")
+    elapsed = time.perf_counter() - t0
+    print(f"[TTS] prewarmed {done} phrase(s), {failed} failed, {elapsed:.1f}s")
+    return done
+
+
+tts_cache = TtsCache()
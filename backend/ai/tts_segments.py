@@ -0,0 +1,104 @@
+import asyncio
+import os
+import re
+
+# -------------------------------
+# Sentence-segmented TTS
+# -------------------------------
+# Long translations are split into sentences that are synthesized in parallel
+# and handed back strictly in order, so the first sentence can be played while
+# the rest are still being synthesized. gTTS mp3 output is a plain sequence of
+# frames, so the segments concatenate into the same clip a single call returns.
+
+TTS_SEGMENT_PARALLEL = int(os.getenv("TTS_SEGMENT_PARALLEL", "4"))
+TTS_SEGMENT_MIN_CHARS = int(os.getenv("TTS_SEGMENT_MIN_CHARS", "12"))
+TTS_SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_MAX_CHARS", "200"))
+
+# sentence end = .!? followed by whitespace (so "3.5" stays intact), or a
+# full-width CJK terminator (no space follows in ja/zh)
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[。！？])")
+_CLAUSE_END = re.compile(r"(?<=[,;:，、；])\s*")
+_CJK_END = ("。", "！", "？", "，", "、", "；")
+
+
+def _join(left, right):
+    # ja/zh sentences are written without a space between them
+    return f"{left}{right}" if left.endswith(_CJK_END) else f"{left} {right}"
+
+
+def _split_long(sentence, max_chars):
+    """Break an over-long sentence on clause punctuation, then on spaces."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    parts, current = [], ""
+    for clause in _CLAUSE_END.split(sentence):
+        if current and len(current) + len(clause) + 1 > max_chars:
+            parts.append(current)
+            current = ""
+        current = _join(current, clause) if current else clause
+        while len(current) > max_chars:
+            cut = current.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            parts.append(current[:cut].strip())
+            current = current[cut:].strip()
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sentences(
+    text, min_chars=TTS_SEGMENT_MIN_CHARS, max_chars=TTS_SEGMENT_MAX_CHARS
+):
+    """
+    'I have a headache. It started yesterday.' → ['I have a headache.', 'It started yesterday.']
+    Fragments shorter than min_chars are merged into the next sentence so a
+    reply like "Yes. ..." is not a separate request.
+    """
+    text = " ".join((text or "").split())
+    if not text:
+        return []
+
+    segments, pending = [], ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pending = _join(pending, sentence) if pending else sentence
+        if len(pending) >= min_chars:
+            segments.extend(_split_long(pending, max_chars))
+            pending = ""
+    if pending:
+        if segments and len(segments[-1]) + len(pending) + 1 <= max_chars:
+            segments[-1] = _join(segments[-1], pending)
+        else:
+            segments.append(pending)
+    return segments
+
+
+async def synthesize_segments(
+    segments, synthesize, on_segment=None, parallel=TTS_SEGMENT_PARALLEL
+):
+    """
+    Run `await synthesize(segment)` for every segment, at most `parallel` at a
+    time (earlier segments first), and call `await on_segment(index, total, audio)`
+    in segment order as soon as each one and all before it are done.
+    Returns the list of audio chunks in order.
+    """
+    semaphore = asyncio.Semaphore(max(1, parallel))
+
+    async def one(segment):
+        async with semaphore:
+            return await synthesize(segment)
+
+    tasks = [asyncio.ensure_future(one(segment)) for segment in segments]
+    chunks = []
+    try:
+        for index, task in enumerate(tasks):
+            audio = await task
+            chunks.append(audio)
+            if on_segment is not None:
+                await on_segment(index, len(tasks), audio)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return chunks
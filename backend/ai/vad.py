@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+
+from ai.audio_decode import TARGET_SAMPLE_RATE
+
+# -------------------------------
+# Vectorized energy VAD
+# -------------------------------
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+VAD_FRAME_MS = float(os.getenv("VAD_FRAME_MS", "30"))
+# absolute floor: frames quieter than this are never speech. Whether a turn is
+# silence at all is decided against this floor only.
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))
+# adaptive part, used only to place the trim edges: speech must stand this far
+# above the utterance's noise floor. Clips with less level spread than this
+# (steady tones, noisy rooms) are trimmed against the absolute floor instead.
+VAD_NOISE_MARGIN_DB = float(os.getenv("VAD_NOISE_MARGIN_DB", "8"))
+# keep this much audio around the detected speech so word edges survive
+VAD_PAD_MS = float(os.getenv("VAD_PAD_MS", "200"))
+# extra audio kept after the last loud frame — soft final syllables trail off
+VAD_HANGOVER_MS = float(os.getenv("VAD_HANGOVER_MS", "500"))
+VAD_MIN_SPEECH_MS = float(os.getenv("VAD_MIN_SPEECH_MS", "120"))
+
+
+def frame_levels_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS level (dBFS) of each full frame, computed in one reshape."""
+    n = len(audio) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n * frame].reshape(n, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def edge_threshold_db(
+    levels: np.ndarray,
+    threshold_db: float = VAD_THRESHOLD_DB,
+    noise_margin_db: float = VAD_NOISE_MARGIN_DB,
+) -> float:
+    """Level used to place the trim edges: noise floor + margin, or the absolute floor."""
+    noise_floor = np.percentile(levels, 10)
+    if np.percentile(levels, 90) - noise_floor < noise_margin_db:
+        # too little dynamic range to tell speech from background
+        return threshold_db
+    return max(threshold_db, noise_floor + noise_margin_db)
+
+
+def speech_mask(
+    audio: np.ndarray,
+    sample_rate: int = TARGET_SAMPLE_RATE,
+    frame_ms: float = VAD_FRAME_MS,
+    threshold_db: float = VAD_THRESHOLD_DB,
+    noise_margin_db: float = VAD_NOISE_MARGIN_DB,
+):
+    """
+    Returns (speech mask, edge mask, frame length in samples).
+    speech: frames above the absolute floor. edge: frames above the adaptive
+    threshold (a subset of speech), used only for trimming.
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000.0))
+    levels = frame_levels_db(audio, frame)
+    if len(levels) == 0:
+        empty = np.zeros(0, dtype=bool)
+        return empty, empty, frame
+    speech = levels >= threshold_db
+    edges = levels >= edge_threshold_db(levels, threshold_db, noise_margin_db)
+    return speech, edges, frame
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int = TARGET_SAMPLE_RATE,
+    pad_ms: float = VAD_PAD_MS,
+    min_speech_ms: float = VAD_MIN_SPEECH_MS,
+    hangover_ms: float = VAD_HANGOVER_MS,
+):
+    """
+    Cut leading/trailing silence.
+
+    Returns: (trimmed audio, info) where info is
+        {"is_silence", "original_samples", "speech_samples", "trimmed_samples",
+         "leading_samples", "trailing_samples"}
+    All-silence input returns an empty array with is_silence=True.
+    """
+    total = len(audio)
+    speech, edges, frame = speech_mask(audio, sample_rate)
+    speech_frames = int(speech.sum())
+
+    if speech_frames * frame < sample_rate * min_speech_ms / 1000.0:
+        return audio[:0], {
+            "is_silence": True,
+            "original_samples": total,
+            "speech_samples": 0,
+            "trimmed_samples": total,
+            "leading_samples": total,
+            "trailing_samples": 0,
+        }
+
+    idx = np.flatnonzero(edges if edges.any() else speech)
+    pad = int(sample_rate * pad_ms / 1000.0)
+    hangover = int(sample_rate * hangover_ms / 1000.0)
+    start = max(0, int(idx[0]) * frame - pad)
+    end = min(total, (int(idx[-1]) + 1) * frame + pad + hangover)
+
+    trimmed = audio[start:end]
+    return trimmed, {
+        "is_silence": False,
+        "original_samples": total,
+        "speech_samples": len(trimmed),
+        "trimmed_samples": total - len(trimmed),
+        "leading_samples": start,
+        "trailing_samples": total - end,
+    }
+
+
+def apply_vad(audio: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE):
+    """trim_silence() honoring VAD_ENABLED (disabled → audio passes through untouched)."""
+    if not VAD_ENABLED:
+        return audio, {
+            "is_silence": False,
+            "original_samples": len(audio),
+            "speech_samples": len(audio),
+            "trimmed_samples": 0,
+            "leading_samples": 0,
+            "trailing_samples": 0,
+        }
+    return trim_silence(audio, sample_rate)
+
+
+def silence_run_lengths(loud: np.ndarray, carry_run: int = 0) -> np.ndarray:
+    """
+    For each frame, the number of consecutive quiet frames ending at it
+    (carry_run continues a run from the previous call). Vectorized, no Python loop.
+    """
+    n = len(loud)
+    positions = np.arange(n)
+    last_loud = np.maximum.accumulate(np.where(loud, positions, -1))
+    runs = positions - last_loud
+    runs[last_loud < 0] += carry_run
+    return runs
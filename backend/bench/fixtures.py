@@ -0,0 +1,89 @@
+import io
+import os
+import wave
+
+import numpy as np
+
+# -------------------------------
+# Benchmark audio fixtures
+# -------------------------------
+# synthetic: speech-like clips (voiced harmonics with a syllable-rate envelope,
+#            short pauses, leading/trailing silence) generated on the fly, so the
+#            repo does not carry binary audio. Same seed → same bytes.
+# recorded:  every *.wav in BENCH_FIXTURES_DIR (or --fixtures-dir), e.g. real
+#            clinic recordings that must not be committed.
+
+SAMPLE_RATE = 16000
+SYNTHETIC_SECONDS = (1.0, 3.0, 5.0, 10.0, 30.0)
+BENCH_FIXTURES_DIR = os.getenv("BENCH_FIXTURES_DIR", "bench/fixtures")
+
+
+def encode_wav(samples, sample_rate=SAMPLE_RATE) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def synthetic_speech(seconds, seed=0, sample_rate=SAMPLE_RATE, silence_s=0.3):
+    """Voiced-speech-like float32 signal of `seconds` (incl. silence padding)."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    pad = min(int(silence_s * sample_rate), n // 4)
+    t = np.arange(n - 2 * pad) / sample_rate
+
+    # pitch wandering around 120-220 Hz, five harmonics with falling energy
+    f0 = 170 + 50 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+
+    # ~4 syllables/s with a pause every couple of seconds
+    envelope = np.clip(np.sin(2 * np.pi * 2.0 * t), 0, None) ** 0.5
+    envelope *= (np.sin(2 * np.pi * 0.4 * t + rng.uniform(0, np.pi)) > -0.8)
+    speech = 0.25 * voiced * envelope + 0.003 * rng.standard_normal(len(t))
+
+    audio = np.zeros(n, dtype=np.float32)
+    audio[pad : pad + len(speech)] = speech
+    audio[:pad] = 0.001 * rng.standard_normal(pad)
+    audio[pad + len(speech) :] = 0.001 * rng.standard_normal(n - pad - len(speech))
+    return audio.astype(np.float32)
+
+
+def synthetic_fixtures(seconds=SYNTHETIC_SECONDS):
+    """[{"name", "seconds", "wav"}] — one clip per length."""
+    return [
+        {
+            "name": f"synthetic_{s:g}s",
+            "seconds": s,
+            "wav": encode_wav(synthetic_speech(s, seed=i)),
+        }
+        for i, s in enumerate(seconds)
+    ]
+
+
+def recorded_fixtures(directory=BENCH_FIXTURES_DIR):
+    if not directory or not os.path.isdir(directory):
+        return []
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(".wav"):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            raw = f.read()
+        with wave.open(io.BytesIO(raw)) as wav:
+            seconds = wav.getnframes() / wav.getframerate()
+        fixtures.append({"name": name, "seconds": round(seconds, 2), "wav": raw})
+    return fixtures
+
+
+def load_fixtures(kinds=("synthetic", "recorded"), directory=BENCH_FIXTURES_DIR):
+    fixtures = []
+    if "synthetic" in kinds:
+        fixtures += synthetic_fixtures()
+    if "recorded" in kinds:
+        fixtures += recorded_fixtures(directory)
+    return fixtures
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import socket
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bench import standins
+from bench.fixtures import BENCH_FIXTURES_DIR, load_fixtures
+
+# -------------------------------
+# End-to-end pipeline benchmark
+# -------------------------------
+#   cd backend
+#   python -m bench.run --mode both --clients 4 --turns 10 --out bench_results.json
+#
+# inprocess: N concurrent simulated sessions call run_speech_turn directly
+#            (decode → vad → asr/emotion → route → translate → tts), plus
+#            response serialization as "send".
+# ws:        the real app is served by uvicorn on a local port and N WebSocket
+#            clients talk the /ws/speech JSON protocol; "send" is the client
+#            round trip minus the server-side pipeline time.
+#
+# Per-stage p50/p95/p99 and turns/sec go to a JSON file with sorted keys, so two
+# runs (e.g. before/after a commit) can be compared with a plain diff.
+
+STAGES = ("decode", "vad", "asr", "emotion", "route", "translate", "tts", "send", "turn")
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "count": int(arr.size),
+        "mean": round(float(arr.mean()), 2),
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p95": round(float(np.percentile(arr, 95)), 2),
+        "p99": round(float(np.percentile(arr, 99)), 2),
+    }
+
+
+def summarize(samples, wall_s, errors):
+    """samples: [{"fixture", "stage timings..."}] → report section."""
+    stages = {}
+    for stage in STAGES:
+        stats = _percentiles([s[stage] for s in samples if stage in s])
+        if stats:
+            stages[stage] = stats
+
+    per_fixture = {}
+    for name in sorted({s["fixture"] for s in samples}):
+        per_fixture[name] = _percentiles([s["turn"] for s in samples if s["fixture"] == name])
+
+    return {
+        "turns": len(samples),
+        "errors": errors,
+        "wall_s": round(wall_s, 2),
+        "turns_per_sec": round(len(samples) / wall_s, 3) if wall_s else 0.0,
+        "stages_ms": stages,
+        "turn_ms_by_fixture": per_fixture,
+    }
+
+
+def _schedule(fixtures, clients, turns):
+    """Each client cycles through the fixtures from a different offset."""
+    return [[fixtures[(c + t) % len(fixtures)] for t in range(turns)] for c in range(clients)]
+
+
+# -------------------------------
+# In-process driver
+# -------------------------------
+async def run_inprocess(main, fixtures, clients, turns, target_lang):
+    samples, errors = [], []
+
+    async def client(plan):
+        session = main.session_registry.open()
+        for fixture in plan:
+            session["turn_counter"] += 1
+            speaker_id = session["speaker_id"]
+            turn = {
+                "session": session,
+                "audio_b64": fixture["b64"],
+                "audio_bytes": None,
+                "audio_stream": None,
+                "audio_format": "audio/wav",
+                "speaker_id": speaker_id,
+                "target_lang": target_lang,
+                "language_hint": main.language_hint(
+                    session["speaker_languages"],
+                    speaker_id,
+                    fallback=session["last_target_lang"] if speaker_id == 2 else None,
+                ),
+            }
+            t0 = time.perf_counter()
+            try:
+                run = await main.run_speech_turn(turn)
+                if run.stopped_at == "vad":
+                    response = main.build_silence_response(run, session["turn_counter"], speaker_id)
+                else:
+                    response = main.build_speech_response(
+                        run,
+                        session["turn_counter"],
+                        speaker_id,
+                        {"tts_audio_b64": base64.b64encode(run.results["tts"]).decode()},
+                    )
+                    main.learn_language(
+                        session["speaker_languages"], speaker_id, run.results["asr"]
+                    )
+                    session["speaker_id"] = 2 if speaker_id == 1 else 1
+                t_send = time.perf_counter()
+                json.dumps(response, ensure_ascii=False)
+                finished = time.perf_counter()
+            except Exception as e:
+                errors.append(f"{fixture['name']}: {e}")
+                continue
+            sample = {"fixture": fixture["name"], **run.timings_ms()}
+            sample.pop("total", None)
+            sample["send"] = (finished - t_send) * 1000.0
+            sample["turn"] = (finished - t0) * 1000.0
+            samples.append(sample)
+        main.session_registry.close(session["session_id"])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(plan) for plan in _schedule(fixtures, clients, turns)))
+    return summarize(samples, time.perf_counter() - t0, errors)
+
+
+# -------------------------------
+# WebSocket driver
+# -------------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_ws(main, fixtures, clients, turns, target_lang):
+    import uvicorn
+    import websockets
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    samples, errors = [], []
+    url = f"ws://127.0.0.1:{port}/ws/speech"
+
+    async def client(plan):
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.recv()  # {"type": "session", ...}
+            for fixture in plan:
+                message = json.dumps(
+                    {
+                        "command": "transcribe",
+                        "audio": fixture["b64"],
+                        "audio_format": "audio/wav",
+                        "target_lang1": target_lang,
+                    }
+                )
+                t0 = time.perf_counter()
+                await ws.send(message)
+                while True:
+                    response = json.loads(await ws.recv())
+                    if response.get("type") in ("speech", "silence") or (
+                        response.get("status") == "error"
+                    ):
+                        break
+                elapsed = (time.perf_counter() - t0) * 1000.0
+                if response.get("status") == "error":
+                    errors.append(f"{fixture['name']}: {response.get('message')}")
+                    continue
+                timings = dict(response.get("timings") or {})
+                server_total = timings.pop("total", 0.0)
+                samples.append(
+                    {
+                        "fixture": fixture["name"],
+                        **timings,
+                        "send": max(elapsed - server_total, 0.0),
+                        "turn": elapsed,
+                    }
+                )
+
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(*(client(plan) for plan in _schedule(fixtures, clients, turns)))
+    finally:
+        wall = time.perf_counter() - t0
+        server.should_exit = True
+        await server_task
+    return summarize(samples, wall, errors)
+
+
+# -------------------------------
+# Entry point
+# -------------------------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _warm_up(main, fixtures, target_lang):
+    """Load models and fill thread pools before anything is timed."""
+    shortest = min(fixtures, key=lambda f: f["seconds"])
+    await run_inprocess(main, [shortest], clients=1, turns=1, target_lang=target_lang)
+
+
+async def main_async(args):
+    translate_server, endpoint = standins.start_translate_server(args.translate_latency_ms)
+    standins.configure_environment(endpoint, keep_caches=args.keep_caches)
+
+    import main  # noqa: E402 — env above must be set first
+
+    standins.install(
+        main,
+        tts_latency_ms=args.tts_latency_ms,
+        mongo_latency_ms=args.mongo_latency_ms,
+        model_standins=args.model_standins,
+    )
+
+    fixtures = load_fixtures(args.fixtures.split(","), args.fixtures_dir)
+    if args.max_seconds:
+        fixtures = [f for f in fixtures if f["seconds"] <= args.max_seconds]
+    if not fixtures:
+        raise SystemExit("No fixtures selected")
+    for fixture in fixtures:
+        fixture["b64"] = base64.b64encode(fixture["wav"]).decode()
+
+    await _warm_up(main, fixtures, args.target_lang)
+
+    from ai.model_registry import model_registry
+    from ai.speech_detection import ASR_BACKEND, ASR_MODEL_SIZE
+    from ai.emotion_runtime import EMOTION_MODEL_MODE
+    from executors import MODEL_EXECUTOR, MODEL_WORKERS
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "clients": args.clients,
+            "turns_per_client": args.turns,
+            "asr": "standin" if args.model_standins else f"{ASR_BACKEND}:{ASR_MODEL_SIZE}",
+            "emotion": "standin" if args.model_standins else EMOTION_MODEL_MODE,
+            "model_executor": f"{MODEL_EXECUTOR}x{MODEL_WORKERS}",
+            "standin_latency_ms": {
+                "translate": args.translate_latency_ms,
+                "tts": args.tts_latency_ms,
+                "mongo": args.mongo_latency_ms,
+            },
+            "caches": args.keep_caches,
+            "models": {n: s["state"] for n, s in model_registry.status().items()},
+            "fixtures": [{"name": f["name"], "seconds": f["seconds"]} for f in fixtures],
+        }
+    }
+
+    if args.mode in ("inprocess", "both"):
+        print(f"[BENCH] in-process: {args.clients} clients x {args.turns} turns")
+        report["inprocess"] = await run_inprocess(
+            main, fixtures, args.clients, args.turns, args.target_lang
+        )
+    if args.mode in ("ws", "both"):
+        print(f"[BENCH] /ws/speech: {args.clients} clients x {args.turns} turns")
+        report["ws"] = await run_ws(main, fixtures, args.clients, args.turns, args.target_lang)
+
+    translate_server.shutdown()
+    main.shutdown_executors(wait=False)
+    return report
+
+
+def _print_summary(report):
+    for mode in ("inprocess", "ws"):
+        section = report.get(mode)
+        if not section:
+            continue
+        print(
+            f"\n{mode}: {section['turns']} turns, {section['turns_per_sec']} turns/s, "
+            f"{len(section['errors'])} errors"
+        )
+        print(f"  {'stage':<10} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, stats in section["stages_ms"].items():
+            print(f"  {stage:<10} {stats['p50']:>9} {stats['p95']:>9} {stats['p99']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EmoAI pipeline benchmark")
+    parser.add_argument("--mode", choices=("inprocess", "ws", "both"), default="both")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=10, help="turns per client")
+    parser.add_argument("--fixtures", default="synthetic,recorded")
+    parser.add_argument("--fixtures-dir", default=BENCH_FIXTURES_DIR)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--target-lang", default="en")
+    parser.add_argument("--translate-latency-ms", type=float, default=80.0)
+    parser.add_argument("--tts-latency-ms", type=float, default=150.0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="leave the translation / TTS caches on")
+    parser.add_argument("--model-standins", action="store_true",
+                        help="fake Whisper / wav2vec2 (measures framework overhead only)")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    _print_summary(report)
+    print(f"\n[BENCH] results → {args.out}")
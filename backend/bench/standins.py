@@ -0,0 +1,182 @@
+import hashlib
+import http.server
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+# -------------------------------
+# Local stand-ins for external services
+# -------------------------------
+# The benchmark must run offline and measure our code, not Google's latency, so
+#   translation → local HTTP server answering in the gtx format
+#                 (TRANSLATION_BACKEND=http + TRANSLATE_ENDPOINT)
+#   TTS         → fake gTTS returning deterministic mp3-sized bytes
+#   MongoDB     → in-memory collection
+# Each stand-in sleeps for a fixed latency so the numbers stay realistic.
+#
+# --model-standins additionally replaces Whisper / wav2vec2 with fakes whose
+# cost scales with the audio length — useful to measure pipeline, executor and
+# WebSocket overhead on a machine without the models.
+
+
+# ---- translation ----
+class _TranslateHandler(http.server.BaseHTTPRequestHandler):
+    latency_s = 0.0
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        text = query.get("q", [""])[0]
+        target = query.get("tl", ["en"])[0]
+        time.sleep(self.latency_s)
+        body = json.dumps([[[f"[{target}] {text}", text, None, None]]]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_translate_server(latency_ms=80.0):
+    """→ (server, endpoint url). server.shutdown() stops it."""
+    handler = type("Handler", (_TranslateHandler,), {"latency_s": latency_ms / 1000.0})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="bench-translate", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/translate_a/single"
+
+
+# ---- TTS ----
+def fake_gtts(latency_ms=150.0, bytes_per_char=180):
+    """Replacement for main._gtts_synthesize(text, lang_code) → bytes."""
+
+    def synthesize(text, lang_code):
+        time.sleep(latency_ms / 1000.0)
+        seed = hashlib.sha256(f"{lang_code}:{text}".encode()).digest()
+        size = max(len(text), 1) * bytes_per_char
+        return b"ID3" + (seed * (size // len(seed) + 1))[:size]
+
+    return synthesize
+
+
+# ---- MongoDB ----
+class _InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class _InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class InMemoryCollection:
+    """The part of a pymongo Collection the app uses, kept in a list."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_s = latency_ms / 1000.0
+        self.documents = []
+        self._lock = threading.Lock()
+
+    def _with_id(self, document):
+        from bson import ObjectId
+
+        document.setdefault("_id", ObjectId())
+        return document
+
+    def insert_one(self, document):
+        time.sleep(self.latency_s)
+        with self._lock:
+            self.documents.append(dict(self._with_id(document)))
+        return _InsertOneResult(document["_id"])
+
+    def insert_many(self, documents, ordered=True):
+        time.sleep(self.latency_s)
+        with self._lock:
+            for document in documents:
+                self.documents.append(dict(self._with_id(document)))
+        return _InsertManyResult([d["_id"] for d in documents])
+
+    def find(self, *args, **kwargs):
+        with self._lock:
+            return iter([dict(d) for d in self.documents])
+
+    def count_documents(self, filter=None):
+        with self._lock:
+            return len(self.documents)
+
+
+# ---- models ----
+class FakeAsrBackend:
+    name = "standin"
+
+    def __init__(self, realtime_factor=0.1):
+        self.realtime_factor = realtime_factor
+
+    def detect_language(self, audio):
+        # language ID looks at the first 30 s only and is ~10x cheaper than decoding
+        time.sleep(min(len(audio), 16000 * 30) / 16000 * self.realtime_factor * 0.1)
+        return "ko", 0.99
+
+    def transcribe(self, audio, language):
+        time.sleep(len(audio) / 16000 * self.realtime_factor)
+        words = max(int(len(audio) / 16000 * 2.5), 1)
+        return {
+            "language": language or "ko",
+            "text": " ".join(["안녕하세요."] * words),
+            "avg_logprob": -0.3,
+        }
+
+
+class FakeEmotionClassifier:
+    mode = "standin"
+    id2label = {0: "neu", 1: "hap", 2: "ang", 3: "sad"}
+
+    def __init__(self, realtime_factor=0.02):
+        self.realtime_factor = realtime_factor
+
+    def extractor(self, speech, sampling_rate, return_tensors="np", padding=False,
+                  return_attention_mask=False):
+        if isinstance(speech, list):
+            n = max(len(s) for s in speech)
+            values = np.stack([np.pad(s, (0, n - len(s))) for s in speech])
+            return {"input_values": values, "attention_mask": np.ones(values.shape, np.int64)}
+        return {"input_values": np.asarray(speech)[None]}
+
+    def logits(self, input_values, attention_mask=None):
+        time.sleep(input_values.size / 16000 * self.realtime_factor)
+        energy = np.sqrt(np.mean(np.square(input_values), axis=-1))
+        return np.stack([energy, 1 - energy, energy / 2, energy / 3], axis=-1)
+
+
+# ---- wiring ----
+def configure_environment(translate_endpoint, keep_caches=False):
+    """Must run before main / ai.* are imported — they read env at import time."""
+    os.environ["TRANSLATION_BACKEND"] = "http"
+    os.environ["TRANSLATION_BULK_BACKEND"] = "http"
+    os.environ["TRANSLATE_ENDPOINT"] = translate_endpoint
+    os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=200")
+    os.environ.setdefault("DB_NAME", "emoai_bench")
+    os.environ["MODEL_WARMUP"] = "0"  # the benchmark warms up explicitly
+    if not keep_caches:
+        # every turn should pay for translation and TTS like a first-time phrase
+        os.environ["TTS_CACHE_ENABLED"] = "0"
+        os.environ["TRANSLATION_CACHE_SIZE"] = "0"
+        os.environ["TRANSLATION_CACHE_DB"] = ""
+
+
+def install(main, tts_latency_ms=150.0, mongo_latency_ms=2.0, model_standins=False):
+    main._gtts_synthesize = fake_gtts(tts_latency_ms)
+    main.emotions_collection = InMemoryCollection(mongo_latency_ms)
+    main.emotion_writer.collection = main.emotions_collection
+    if model_standins:
+        from ai.model_registry import model_registry
+
+        model_registry.override("whisper", FakeAsrBackend())
+        model_registry.override("emotion", FakeEmotionClassifier())
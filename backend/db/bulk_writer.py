@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+
+from ai.metrics import metrics_registry, register_collector
+from executors import run_io
+
+# -------------------------------
+# Async write-behind buffer for MongoDB
+# -------------------------------
+# put() assigns the _id, queues the document and returns immediately; a
+# background task drains the queue into insert_many() (on the io pool) when
+# MONGO_WRITE_BATCH documents are pending or MONGO_WRITE_FLUSH_MS after the
+# first one arrived, whichever comes first. When MONGO_WRITE_QUEUE documents are
+# waiting, put() waits for room (up to MONGO_WRITE_PUT_TIMEOUT_S) instead of
+# growing memory without bound. flush() / close() cut the wait short and write
+# everything still queued.
+#
+# Works with anything that has insert_many(documents, ordered=False), e.g.
+# bench.standins.InMemoryCollection:
+#   writer = BulkWriter(InMemoryCollection(), name="test")
+#   writer.start(); await writer.put({...}); await writer.close()
+
+MONGO_WRITE_BATCH = int(os.getenv("MONGO_WRITE_BATCH", "100"))
+MONGO_WRITE_FLUSH_MS = float(os.getenv("MONGO_WRITE_FLUSH_MS", "200"))
+MONGO_WRITE_QUEUE = int(os.getenv("MONGO_WRITE_QUEUE", "10000"))
+MONGO_WRITE_PUT_TIMEOUT_S = float(os.getenv("MONGO_WRITE_PUT_TIMEOUT_S", "5"))
+MONGO_WRITE_RETRIES = int(os.getenv("MONGO_WRITE_RETRIES", "3"))
+
+WRITE_LATENCY = metrics_registry.histogram(
+    "emoai_mongo_write_seconds", "insert_many duration per batch"
+)
+WRITE_BATCH_SIZE = metrics_registry.histogram(
+    "emoai_mongo_write_batch_size",
+    "Documents per insert_many",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+WRITE_DOCUMENTS = metrics_registry.counter(
+    "emoai_mongo_write_documents_total", "Documents written by outcome"
+)
+
+_DUPLICATE_KEY = 11000
+# queued by flush(): the batch being collected goes out without waiting for the timer
+_FLUSH = object()
+
+
+class BulkWriteFull(Exception):
+    """The write buffer stayed full for MONGO_WRITE_PUT_TIMEOUT_S."""
+
+
+class BulkWriter:
+    def __init__(
+        self,
+        collection,
+        max_batch=MONGO_WRITE_BATCH,
+        flush_ms=MONGO_WRITE_FLUSH_MS,
+        max_queue=MONGO_WRITE_QUEUE,
+        put_timeout=MONGO_WRITE_PUT_TIMEOUT_S,
+        retries=MONGO_WRITE_RETRIES,
+        name="mongo",
+    ):
+        self.collection = collection
+        self.max_batch = max(1, int(max_batch))
+        self.flush_delay = max(0.0, float(flush_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self.put_timeout = put_timeout
+        self.retries = max(0, int(retries))
+        self.name = name
+        self._queue = None
+        self._task = None
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        register_collector(self._collect)
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    def start(self):
+        """Start the drain task on the running event loop (idempotent)."""
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def put(self, document):
+        """Queue one document; returns its _id. Raises BulkWriteFull on backpressure timeout."""
+        self.start()
+        if "_id" not in document:
+            from bson import ObjectId
+
+            document["_id"] = ObjectId()
+        try:
+            await asyncio.wait_for(self._queue.put(document), self.put_timeout)
+        except asyncio.TimeoutError:
+            raise BulkWriteFull(
+                f"{self.name} write buffer full ({self.max_queue} documents)"
+            ) from None
+        return document["_id"]
+
+    async def flush(self):
+        """Wait until everything queued so far has been written (or given up on)."""
+        if self._queue is None or self._task is None:
+            return
+        await self._queue.put(_FLUSH)
+        await self._queue.join()
+
+    async def close(self, timeout=None):
+        """Write what is still queued, then stop the drain task."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {self.name}: {self._queue.qsize()} documents not written at shutdown")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "pending": self.pending(),
+            "max_queue": self.max_queue,
+            "max_batch": self.max_batch,
+            "flush_ms": self.flush_delay * 1000.0,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    # -------------------------------
+    # Drain loop
+    # -------------------------------
+    def _take(self, batch, document):
+        """Add document to batch; False when it was the flush marker."""
+        if document is _FLUSH:
+            self._queue.task_done()
+            return False
+        batch.append(document)
+        return True
+
+    async def _next_batch(self):
+        batch = []
+        if not self._take(batch, await self._queue.get()):
+            return batch
+        deadline = time.monotonic() + self.flush_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                document = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if not self._take(batch, document):
+                return batch
+        # whatever else is already waiting goes into the same batch
+        while len(batch) < self.max_batch and not self._queue.empty():
+            if not self._take(batch, self._queue.get_nowait()):
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch):
+        for attempt in range(self.retries + 1):
+            t0 = time.perf_counter()
+            try:
+                await run_io(self.collection.insert_many, batch, ordered=False)
+            except Exception as e:
+                if _only_duplicates(e):
+                    # a previous attempt got through before failing — nothing left to write
+                    break
+                print(f"⚠️ {self.name}: insert_many of {len(batch)} failed ({attempt + 1}): {e}")
+                if attempt < self.retries:
+                    await asyncio.sleep(min(0.2 * 2**attempt, 5.0))
+                    continue
+                self.failed += len(batch)
+                WRITE_DOCUMENTS.inc(len(batch), writer=self.name, outcome="failed")
+                return
+            else:
+                WRITE_LATENCY.observe(time.perf_counter() - t0, writer=self.name)
+                break
+        self.batches += 1
+        self.written += len(batch)
+        WRITE_BATCH_SIZE.observe(len(batch), writer=self.name)
+        WRITE_DOCUMENTS.inc(len(batch), writer=self.name, outcome="written")
+
+    def _collect(self):
+        yield (
+            "emoai_mongo_write_queue_depth",
+            "gauge",
+            "Documents waiting in the write buffer",
+            {"writer": self.name},
+            self.pending(),
+        )
+
+
+def _only_duplicates(error):
+    details = getattr(error, "details", None) or {}
+    errors = details.get("writeErrors") if isinstance(details, dict) else None
+    return bool(errors) and all(e.get("code") == _DUPLICATE_KEY for e in errors)
@@ -9,8 +9,23 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-# 3. Connect to MongoDB
-client = MongoClient(MONGO_URI)
+# Connection pool (shared by every request thread and the bulk writer)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+
+# 3. Connect to MongoDB — the one client for the whole process; import `client` /
+#    `db` from here instead of building another MongoClient.
+#    (MongoClient connects lazily, the first query opens the pool.)
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+    serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_TIMEOUT_MS,
+)
 db = client[DB_NAME]
 
-print("MongoDB Connected Successfully:", DB_NAME)
\ No newline at end of file
+print("MongoDB client configured:", DB_NAME)
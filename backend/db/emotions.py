@@ -0,0 +1,176 @@
+import base64
+import json
+import os
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+# -------------------------------
+# emotions collection queries
+# -------------------------------
+# Keyset pagination: each page continues after the last (sort key, _id) of the
+# previous one, so page N costs the same as page 1 and no skip() is involved.
+# The cursor handed to the client is that pair, base64-encoded.
+#
+#   sort=_id        → filter on _id only (default)
+#   sort=timestamp  → (timestamp, _id); pairs with since/until range filters
+#
+# ensure_indexes() creates the compound indexes these queries use: an equality
+# filter on emotion / speaker is followed by the sort key of either mode.
+# A cursor only continues the sort it was issued for (see decode_cursor).
+
+EMOTIONS_PAGE_SIZE = int(os.getenv("EMOTIONS_PAGE_SIZE", "100"))
+EMOTIONS_PAGE_MAX = int(os.getenv("EMOTIONS_PAGE_MAX", "1000"))
+EMOTIONS_EXPORT_BATCH = int(os.getenv("EMOTIONS_EXPORT_BATCH", "1000"))
+
+SORT_KEYS = ("_id", "timestamp")
+ORDERS = ("asc", "desc")
+
+EMOTION_INDEXES = [
+    [("timestamp", ASCENDING), ("_id", ASCENDING)],
+    [("emotion", ASCENDING), ("_id", ASCENDING)],
+    [("speaker", ASCENDING), ("_id", ASCENDING)],
+    [("emotion", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+    [("speaker", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+]
+
+
+def ensure_indexes(collection):
+    """Idempotent; an existing index with the same keys is left alone."""
+    return [collection.create_index(keys) for keys in EMOTION_INDEXES]
+
+
+def encode_cursor(document, sort):
+    key = {"id": str(document["_id"])}
+    if sort == "timestamp":
+        key["ts"] = document.get("timestamp")
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort="_id"):
+    """ValueError for garbage, and for a cursor issued under the other sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key["id"] = ObjectId(key["id"])
+    except (ValueError, TypeError, KeyError, InvalidId):
+        raise ValueError("invalid cursor") from None
+    if ("ts" in key) != (sort == "timestamp"):
+        raise ValueError(f"cursor does not match sort={sort}")
+    return key
+
+
+def _split(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [v.strip() for v in value if v and v.strip()]
+
+
+def _normalize_timestamp(value):
+    """ISO-8601 → datetime.utcnow().isoformat() form. ValueError on garbage."""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat()
+
+
+def build_query(since=None, until=None, emotion=None, speaker=None):
+    """
+    Filter document. since/until are ISO-8601 strings; they are re-serialized with
+    isoformat() so they compare as text against the stored `timestamp` (what
+    save_emotion writes: naive UTC, "T" separator). A UTC offset is converted to UTC.
+    emotion / speaker accept a single value or a comma-separated list.
+    """
+    query = {}
+    time_range = {}
+    for op, value in (("$gte", since), ("$lt", until)):
+        if value:
+            time_range[op] = _normalize_timestamp(value)
+    if time_range:
+        query["timestamp"] = time_range
+    for field, value in (("emotion", emotion), ("speaker", speaker)):
+        values = _split(value)
+        if len(values) == 1:
+            query[field] = values[0]
+        elif values:
+            query[field] = {"$in": values}
+    return query
+
+
+def build_projection(fields, sort="_id"):
+    """None (whole document) or {field: 1}; _id and the sort key are always kept."""
+    fields = _split(fields)
+    if not fields:
+        return None
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 1
+    projection[sort] = 1
+    return projection
+
+
+def _after(query, key, sort, descending):
+    op = "$lt" if descending else "$gt"
+    if sort == "_id":
+        after = {"_id": {op: key["id"]}}
+    else:
+        after = {
+            "$or": [
+                {"timestamp": {op: key["ts"]}},
+                {"timestamp": key["ts"], "_id": {op: key["id"]}},
+            ]
+        }
+    return {"$and": [query, after]} if query else after
+
+
+def check_order(sort, order):
+    """ValueError unless sort / order are supported → descending flag."""
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {', '.join(ORDERS)}")
+    return order == "desc"
+
+
+def _find(collection, query, projection, sort, descending, cursor, batch_size=None):
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+    if cursor:
+        query = _after(query, decode_cursor(cursor, sort), sort, descending)
+    direction = DESCENDING if descending else ASCENDING
+    order = [("_id", direction)] if sort == "_id" else [(sort, direction), ("_id", direction)]
+    found = collection.find(query, projection).sort(order)
+    if batch_size:
+        found = found.batch_size(batch_size)
+    return found
+
+
+def find_page(collection, query, projection=None, sort="_id", descending=False,
+              cursor=None, limit=EMOTIONS_PAGE_SIZE):
+    """→ (documents with string _id, next cursor or None)."""
+    limit = max(1, min(int(limit), EMOTIONS_PAGE_MAX))
+    documents = list(
+        _find(collection, query, projection, sort, descending, cursor).limit(limit + 1)
+    )
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], sort)
+    for document in documents:
+        document["_id"] = str(document["_id"])
+    return documents, next_cursor
+
+
+def iter_ndjson(collection, query, projection=None, sort="_id", descending=False, cursor=None):
+    """One JSON line per document, read from Mongo in EMOTIONS_EXPORT_BATCH batches."""
+    found = _find(
+        collection, query, projection, sort, descending, cursor, EMOTIONS_EXPORT_BATCH
+    )
+    try:
+        for document in found:
+            yield json.dumps(document, ensure_ascii=False, default=str) + "\n"
+    finally:
+        found.close()
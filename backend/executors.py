@@ -0,0 +1,152 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ai.model_registry import MODEL_READY_REQUIRED, MODEL_WARMUP
+from ai.profiling import current_capture
+
+# -------------------------------
+# Executor-backed inference layer
+# -------------------------------
+# - model pool: CPU-bound work (audio decode, Whisper, wav2vec2)
+#     MODEL_EXECUTOR=thread (default) → torch releases the GIL inside kernels and
+#                                       every worker shares the loaded models
+#     MODEL_EXECUTOR=process          → each worker process loads its own models
+#                                       (spawned, never forked: torch + threads);
+#                                       readiness = every worker has warmed up
+# - io pool: network-bound work (translation, gTTS)
+#
+# A slow turn only blocks its own worker, never the event loop.
+#
+# Calls made while a profile capture is active (ai/profiling.py) run under the
+# profiler; with MODEL_EXECUTOR=process only the io pool is profiled.
+
+MODEL_EXECUTOR = os.getenv("MODEL_EXECUTOR", "thread").lower()
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+
+_model_pool = None
+_io_pool = None
+_workers_ready = None  # process mode: shared count of workers with warm models
+
+
+def _init_model_worker(ready_counter, warm):
+    """Worker process initializer: load + warm the models before taking work."""
+    if warm:
+        import ai.speech_detection  # noqa: F401 — registers the models
+        from ai.model_registry import model_registry
+
+        for name in MODEL_READY_REQUIRED:
+            try:
+                model_registry.warm(name)
+            except Exception as e:
+                # the worker still serves; the model loads again on first use
+                print(f"⚠️ Worker {os.getpid()}: loading {name} failed: {e}")
+                return
+    with ready_counter.get_lock():
+        ready_counter.value += 1
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def get_model_pool():
+    global _model_pool, _workers_ready
+    if _model_pool is None:
+        if MODEL_EXECUTOR == "process":
+            ctx = multiprocessing.get_context("spawn")
+            _workers_ready = ctx.Value("i", 0)
+            _model_pool = ProcessPoolExecutor(
+                max_workers=MODEL_WORKERS,
+                mp_context=ctx,
+                initializer=_init_model_worker,
+                initargs=(_workers_ready, MODEL_WARMUP),
+            )
+        else:
+            _model_pool = ThreadPoolExecutor(
+                max_workers=MODEL_WORKERS, thread_name_prefix="model"
+            )
+    return _model_pool
+
+
+def start_model_workers():
+    """Process mode: spawn every worker now so they warm up before the first turn."""
+    if MODEL_EXECUTOR != "process":
+        return
+    pool = get_model_pool()
+    for _ in range(MODEL_WORKERS):
+        pool.submit(_worker_pid)
+
+
+def model_workers_ready():
+    """Process mode: True once every worker process has loaded its models."""
+    return _workers_ready is not None and _workers_ready.value >= MODEL_WORKERS
+
+
+def get_io_pool():
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _io_pool
+
+
+async def run_model(fn, *args, **kwargs):
+    """Run CPU-bound model work (decode / ASR / emotion) off the event loop."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    if MODEL_EXECUTOR == "process":
+        # arguments/results must be picklable; context does not cross processes
+        return await loop.run_in_executor(get_model_pool(), call)
+    capture = current_capture()
+    if capture is not None:
+        call = functools.partial(capture.run, call, model=True)
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_model_pool(), ctx.run, call)
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run network-bound work (translation / TTS) off the event loop."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(fn, *args, **kwargs)
+    capture = current_capture()
+    if capture is not None:
+        call = functools.partial(capture.run, call)
+    return await loop.run_in_executor(get_io_pool(), ctx.run, call)
+
+
+def _pool_stats(pool, kind, workers):
+    queue = getattr(pool, "_work_queue", None)  # ThreadPoolExecutor only
+    stats = {
+        "kind": kind,
+        "workers": workers,
+        "started": pool is not None,
+        "queue_depth": queue.qsize() if queue is not None else None,
+    }
+    if kind == "process":
+        stats["ready_workers"] = _workers_ready.value if _workers_ready is not None else 0
+    return stats
+
+
+def stats():
+    """Pool sizes and calls waiting for a worker (queue_depth is None for processes)."""
+    return {
+        "model": _pool_stats(_model_pool, MODEL_EXECUTOR, MODEL_WORKERS),
+        "io": _pool_stats(_io_pool, "thread", IO_WORKERS),
+    }
+
+
+def shutdown_executors(wait: bool = True):
+    global _model_pool, _io_pool
+    global _workers_ready
+    if _model_pool is not None:
+        _model_pool.shutdown(wait=wait, cancel_futures=True)
+        _model_pool = None
+        _workers_ready = None
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=wait, cancel_futures=True)
+        _io_pool = None
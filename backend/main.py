@@ -1,20 +1,81 @@
 import base64
-import tempfile
+import binascii
+import json
+import io
 import asyncio
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+import hmac
+import time
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from ai.speech_translation import translate_json_list
+from ai.translation_cache import translation_cache
+from ai.translation_client import http_translate_client
+from ai.tts_cache import (
+    TTS_CACHE_ENABLED,
+    TTS_CACHE_PREWARM,
+    load_prewarm_phrases,
+    prewarm,
+    tts_cache,
+    tts_key,
+)
 from db.connection import db
+from db.bulk_writer import BulkWriteFull, BulkWriter
+from db.emotions import (
+    EMOTIONS_PAGE_SIZE,
+    build_projection,
+    build_query,
+    check_order,
+    decode_cursor,
+    ensure_indexes,
+    find_page,
+    iter_ndjson,
+)
 from pydantic import BaseModel
-from pymongo import MongoClient
 from datetime import datetime
-import os
 from bson import ObjectId
 from fastapi import Body
-from ai.speech_detection import detect_language_and_transcribe_from_base64
+from ai.audio_decode import decode_audio_base64, decode_audio_bytes
+from ai.audio_stream import UtteranceStream
+from ai.tts_segments import split_sentences, synthesize_segments
+from ai.pipeline import Stage, StagePipeline, StopPipeline
+from ai.vad import apply_vad
+from ai.language_pin import language_hint, learn_language, reset_languages
+from ai.model_registry import MODEL_WARMUP, model_registry
+from ai.metrics import (
+    ACTIVE_SESSIONS,
+    INFLIGHT_TURNS,
+    PAYLOAD_BYTES,
+    STAGE_LATENCY,
+    TURN_LATENCY,
+    TURNS,
+    metrics_registry,
+    register_collector,
+)
+from ai.speech_detection import (
+    detect_emotion_from_audio,
+    emotion_batcher,
+    submit_emotion,
+    transcribe_audio,
+)
+from ai.profiling import ADMIN_TOKEN, current_capture, profiler
 from gtts import gTTS
-import os
-import subprocess
+from executors import (
+    MODEL_EXECUTOR,
+    model_workers_ready,
+    run_io,
+    run_model,
+    shutdown_executors,
+    start_model_workers,
+    stats as executor_stats,
+)
+from sessions import session_registry
 
 app = FastAPI()
 
@@ -26,9 +87,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-last_source_lang = None
-last_target_lang = None
-
 # 언어 코드 매핑 (ISO-639-1 기준)
 LANG_MAP = {
     "ko": "ko",  # 한국어
@@ -39,20 +97,656 @@ LANG_MAP = {
 }
 
 
+# gTTS voice settings — part of the TTS cache key
+TTS_VOICE = {"engine": "gtts", "slow": False}
+
+
+def _gtts_synthesize(text, lang_code) -> bytes:
+    # 임시 파일 없이 메모리 버퍼에 바로 mp3 저장
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang_code, slow=TTS_VOICE["slow"]).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def _tts_key(text, lang):
+    lang_code = LANG_MAP.get(lang, "en")  # 지원하지 않는 언어면 영어로 fallback
+    return lang_code, tts_key(text, lang_code, TTS_VOICE)
+
+
+def synthesize_tts(text, lang="en") -> bytes:
+    """
+    주어진 텍스트와 언어에 맞는 Google TTS 음성(mp3)을 raw bytes로 반환
+    (repeat phrases come from the TTS cache)
+    """
+    lang_code, key = _tts_key(text, lang)
+    if not TTS_CACHE_ENABLED:
+        return _gtts_synthesize(text, lang_code)
+    return tts_cache.get_or_synthesize(key, lambda: _gtts_synthesize(text, lang_code))
+
+
 def generate_tts(text, lang="en"):
     """
     주어진 텍스트와 언어에 맞는 Google TTS 음성을 base64로 반환
     """
-    lang_code = LANG_MAP.get(lang, "en")  # 지원하지 않는 언어면 영어로 fallback
-    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
-        tts = gTTS(text=text, lang=lang_code)
-        tts.save(f.name)
-        f.seek(0)
-        audio_bytes = f.read()
+    return base64.b64encode(synthesize_tts(text, lang=lang)).decode("utf-8")
+
+
+# -------------------------------
+# Speech turn pipeline
+# -------------------------------
+#   decode ── vad ─┬─ asr ── route ── translate ── tts
+#                  └─ emotion
+async def _stage_decode(turn, results):
+    # 한 번만 메모리에서 16kHz mono float32 로 디코딩 → Whisper + emotion 공용
+    if turn.get("audio_stream") is not None:
+        # chunked upload — already decoded incrementally, just flush the tail.
+        # The stream holds a lock and maybe an ffmpeg process, so it stays in this
+        # process (io pool) even with MODEL_EXECUTOR=process; only arrays go further.
+        return await run_io(turn["audio_stream"].finish)
+    if turn.get("audio_bytes") is not None:
+        # binary frame upload — no base64 at all
+        return await run_model(decode_audio_bytes, turn["audio_bytes"], turn["audio_format"])
+    return await run_model(decode_audio_base64, turn["audio_b64"], turn["audio_format"])
+
+
+async def _stage_vad(turn, results):
+    """Trim leading/trailing silence; all-silence input ends the turn right here."""
+    audio, info = await run_model(apply_vad, results["decode"])
+    if info["is_silence"]:
+        raise StopPipeline({"audio": audio, "info": info})
+    return {"audio": audio, "info": info}
+
+
+async def _stage_asr(turn, results):
+    hint = turn.get("language_hint")
+    result = await run_model(transcribe_audio, results["vad"]["audio"], hint)
+    return {**result, "language_hint": hint}
+
+
+async def _stage_emotion(turn, results):
+    if current_capture() is not None:
+        # profiled turns skip the cross-session batcher so wav2vec2 time is theirs
+        emotion = await run_model(detect_emotion_from_audio, results["vad"]["audio"])
+    else:
+        emotion = await asyncio.wrap_future(submit_emotion(results["vad"]["audio"]))
+    if not turn.get("emotion_timeline"):
+        emotion = {k: v for k, v in emotion.items() if k != "timeline"}
+    return emotion
+
+
+def _emotion_part(results):
+    emotion = results["emotion"]
+    part = {"emotion": emotion["emotion"], "emotion_scores": emotion["scores"]}
+    if "timeline" in emotion:
+        part["emotion_timeline"] = emotion["timeline"]
+    return part
+
+
+async def _stage_route(turn, results):
+    """Speaker 1 sets the language pair; Speaker 2 answers in the reverse direction."""
+    session = turn["session"]
+    source_lang = results["asr"]["language"]
+
+    if turn["speaker_id"] == 1:
+        target_lang = turn["target_lang"]
+        session["last_source_lang"] = source_lang
+        session["last_target_lang"] = target_lang
+    else:
+        target_lang = session["last_source_lang"]
+        source_lang = session["last_target_lang"]
+
+    return {"source_lang": source_lang, "target_lang": target_lang}
+
+
+async def _stage_translate(turn, results):
+    route = results["route"]
+    translated = (
+        await run_io(
+            translate_json_list,
+            [
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "lang": route["source_lang"],
+                    "text": results["asr"]["text"],
+                }
+            ],
+            target_lang=route["target_lang"],
+        )
+    )[0]
+
+    return {
+        "timestamp": translated.get("timestamp"),
+        "lang": route["target_lang"],
+        "text": translated.get("translated_text"),
+    }
+
+
+async def _stage_tts(turn, results):
+    """Sentences are synthesized in parallel; segments are delivered in order."""
+    translated = results["translate"]
+    lang = translated["lang"]
+
+    async def synthesize(segment):
+        return await run_io(synthesize_tts, segment, lang=lang)
+
+    on_tts_segment = turn.get("on_tts_segment")
+
+    async def on_segment(index, total, audio):
+        await on_tts_segment(index, total, audio, results)
+
+    chunks = await synthesize_segments(
+        split_sentences(translated["text"]),
+        synthesize,
+        on_segment=on_segment if on_tts_segment else None,
+    )
+    return b"".join(chunks)
+
+
+speech_pipeline = StagePipeline(
+    [
+        Stage("decode", _stage_decode),
+        Stage("vad", _stage_vad, deps=["decode"]),
+        Stage("asr", _stage_asr, deps=["vad"]),
+        Stage("emotion", _stage_emotion, deps=["vad"]),
+        Stage("route", _stage_route, deps=["asr"]),
+        Stage("translate", _stage_translate, deps=["route"]),
+        Stage("tts", _stage_tts, deps=["translate"]),
+    ]
+)
+
+
+def _original_part(results):
+    return {"lang": results["route"]["source_lang"], "text": results["asr"]["text"]}
+
+
+def _vad_part(results):
+    info = results["vad"]["info"]
+    return {
+        "trimmed_samples": info["trimmed_samples"],
+        "speech_samples": info["speech_samples"],
+    }
+
+
+def _language_detection_part(results):
+    asr = results["asr"]
+    return {
+        "skipped": not asr["language_detected"],
+        "hint": asr.get("language_hint"),
+        "probability": asr["language_probability"],
+        "redetected": asr["language_redetected"],
+    }
+
+
+def _translated_part(results):
+    translated = results["translate"]
+    return {
+        "timestamp": translated["timestamp"],
+        "lang": translated["lang"],
+        "text": translated["text"],
+    }
+
+
+class ProgressiveSender:
+    """
+    Streaming response mode: sends one message per milestone, always in this order,
+    each tagged with the turn id and a stage marker.
+        transcript  - original text + emotion   (needs asr, route, emotion)
+        translation - translated text           (needs translate)
+        tts         - synthesized audio         (needs tts)
+    With segmented TTS the audio goes out sentence by sentence as "tts_segment"
+    messages between translation and tts, and the tts milestone carries no audio.
+    Segments synthesized before the translation milestone could go out (e.g.
+    emotion is still running) are held back until it has been sent.
+    """
+
+    MILESTONES = [
+        ("transcript", ("asr", "route", "emotion")),
+        ("translation", ("translate",)),
+        ("tts", ("tts",)),
+    ]
+
+    def __init__(self, connection, turn_id, speaker):
+        self.connection = connection
+        self.turn_id = turn_id
+        self.speaker = speaker
+        self._next = 0
+        self._segments_sent = 0
+        self._held_segments = []
+        self._lock = asyncio.Lock()
+
+    def _message(self, milestone, results):
+        message = {
+            "status": "success",
+            "type": "speech_partial",
+            "turn_id": self.turn_id,
+            "stage": milestone,
+            "speaker": self.speaker,
+        }
+        if milestone == "transcript":
+            message["original"] = _original_part(results)
+            message.update(_emotion_part(results))
+            message["vad"] = _vad_part(results)
+            message["language_detection"] = _language_detection_part(results)
+        elif milestone == "translation":
+            message["translated"] = _translated_part(results)
+        elif self._segments_sent:
+            message["translated"] = {
+                **_translated_part(results),
+                "tts_segments": self._segments_sent,
+            }
+        else:
+            message["translated"] = {
+                **_translated_part(results),
+                **self.connection.tts_fields(results["tts"]),
+            }
+        return message
+
+    def _translation_sent(self):
+        return self._next > [m for m, _ in self.MILESTONES].index("translation")
+
+    async def _send_held_segments(self):
+        while self._held_segments:
+            index, total, audio = self._held_segments.pop(0)
+            self._segments_sent += 1
+            await self.connection.send_tts_segment(self.turn_id, index, total, audio)
+
+    async def _flush(self, results):
+        while self._next < len(self.MILESTONES):
+            milestone, needs = self.MILESTONES[self._next]
+            if not all(n in results for n in needs):
+                break
+            if milestone == "tts":
+                await self._send_held_segments()
+            self._next += 1
+            await self.connection.send_json(self._message(milestone, results))
+            if milestone == "tts" and not self._segments_sent:
+                await self.connection.send_tts_audio(self.turn_id, results["tts"])
+        if self._translation_sent():
+            await self._send_held_segments()
+
+    async def on_stage(self, name, value, results):
+        async with self._lock:
+            await self._flush(results)
+
+    async def on_tts_segment(self, index, total, audio, results):
+        async with self._lock:
+            # the translation milestone always goes out before the first segment
+            self._held_segments.append((index, total, audio))
+            await self._flush(results)
+
+
+async def run_speech_turn(turn, on_stage=None):
+    """
+    Run one utterance through the stage graph.
+
+    turn: {"audio_b64" | "audio_bytes", "audio_format", "speaker_id", "target_lang"}
+    """
+    run = await speech_pipeline.run(turn, on_stage=on_stage)
+    for stage, ms in run.timings_ms().items():
+        if stage != "total":
+            STAGE_LATENCY.observe(ms / 1000.0, stage=stage)
+    TURN_LATENCY.observe(run.total_ms / 1000.0)
+    return run
+
+
+def build_speech_response(run, turn_id, speaker_id, tts_fields):
+    return {
+        "status": "success",
+        "type": "speech",
+        "turn_id": turn_id,
+        "speaker": f"Speaker {speaker_id}",
+        "original": _original_part(run.results),
+        "translated": {**_translated_part(run.results), **tts_fields},
+        **_emotion_part(run.results),
+        "vad": _vad_part(run.results),
+        "language_detection": _language_detection_part(run.results),
+        "timings": run.timings_ms(),
+    }
+
+
+def build_silence_response(run, turn_id, speaker_id):
+    """All-silence turn: nothing was transcribed and the speaker does not change."""
+    return {
+        "status": "success",
+        "type": "silence",
+        "turn_id": turn_id,
+        "speaker": f"Speaker {speaker_id}",
+        "vad": _vad_part(run.results),
+        "timings": run.timings_ms(),
+    }
+
+
+# -------------------------------
+# /ws/speech connection
+# -------------------------------
+class SpeechConnection:
+    """
+    Per-WebSocket protocol state for /ws/speech.
+
+    Two wire formats are negotiated per connection:
+      - JSON/base64 (default, what existing clients send)
+      - binary: {"command": "configure", "binary": true}
+          upload   - JSON header frame (a transcribe command without "audio"),
+                     followed by one binary frame with the raw audio bytes
+          download - the JSON result carries "tts_audio_binary": true instead of
+                     "tts_audio_b64", followed by a {"type": "tts_audio"} header
+                     frame and one binary frame with the raw mp3 bytes
+    """
+
+    def __init__(self, websocket: WebSocket, session: dict):
+        self.websocket = websocket
+        # conversation state (speakers, languages, turn ids) lives in the session
+        # registry; only transport state stays on the connection
+        self.session = session
+        self.options = {
+            "stream": False,
+            "binary": False,
+            "auto_endpoint": False,
+            "tts_segments": False,
+            "emotion_timeline": False,
+        }
+        self.pending_upload = None  # command header waiting for its binary frame
+        self.utterance = None  # UtteranceStream while audio_chunk uploads are open
+        self.utterance_header = None
+
+    # ---- transport ----
+    async def receive(self):
+        """Returns ("text", dict) or ("bytes", bytes)."""
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            return "bytes", message["bytes"]
+        return "text", json.loads(message.get("text") or "{}")
+
+    async def send_json(self, payload):
+        await self.websocket.send_json(payload)
+
+    def tts_fields(self, audio_bytes):
+        if self.options["binary"]:
+            return {"tts_audio_binary": True, "tts_audio_format": "audio/mpeg"}
+        return {"tts_audio_b64": base64.b64encode(audio_bytes).decode("utf-8")}
+
+    async def send_tts_segment(self, turn_id, index, total, audio_bytes):
+        """One sentence of TTS audio; binary mode sends header + raw mp3 frame."""
+        message = {
+            "status": "success",
+            "type": "tts_segment",
+            "turn_id": turn_id,
+            "index": index,
+            "total": total,
+            "final": index == total - 1,
+            "format": "audio/mpeg",
+        }
+        if self.options["binary"]:
+            await self.websocket.send_json({**message, "bytes": len(audio_bytes)})
+            await self.websocket.send_bytes(audio_bytes)
+        else:
+            message["tts_audio_b64"] = base64.b64encode(audio_bytes).decode("utf-8")
+            await self.websocket.send_json(message)
+
+    async def send_tts_audio(self, turn_id, audio_bytes):
+        """Binary mode only: header frame + raw mp3 frame."""
+        if not self.options["binary"]:
+            return
+        await self.websocket.send_json(
+            {
+                "status": "success",
+                "type": "tts_audio",
+                "turn_id": turn_id,
+                "format": "audio/mpeg",
+                "bytes": len(audio_bytes),
+            }
+        )
+        await self.websocket.send_bytes(audio_bytes)
+
+    # ---- commands ----
+    async def handle_text(self, data):
+        command = data.get("command")
+
+        if command == "configure":
+            for key in (
+                "stream",
+                "binary",
+                "auto_endpoint",
+                "tts_segments",
+                "emotion_timeline",
+            ):
+                if key in data:
+                    self.options[key] = bool(data.get(key))
+            if data.get("session_id") and data["session_id"] != self.session["session_id"]:
+                self.session = session_registry.open(data["session_id"])
+            if data.get("reset_language"):
+                reset_languages(self.session["speaker_languages"])
+                session_registry.save(self.session)
+            await self.send_json(
+                {
+                    "status": "success",
+                    "type": "configured",
+                    "session_id": self.session["session_id"],
+                    "options": self.options,
+                }
+            )
+
+        elif command == "transcribe":
+            if data.get("audio") is None and self.options["binary"]:
+                # header frame; the audio arrives in the next binary frame
+                self.pending_upload = data
+                return
+            await self.transcribe(data)
+
+        elif command == "audio_chunk":
+            if data.get("audio") is None and self.options["binary"]:
+                self.pending_upload = data
+                return
+            try:
+                raw = base64.b64decode(data.get("audio") or "", validate=True)
+            except (binascii.Error, TypeError) as e:
+                await self.send_json(
+                    {"status": "error", "message": f"audio_chunk is not valid base64: {e}"}
+                )
+                return
+            await self.audio_chunk(data, raw)
+
+        elif command == "end_utterance":
+            await self.end_utterance(data)
+
+        else:
+            await self.send_json({"status": "error", "message": "Unknown command."})
+
+    async def handle_bytes(self, raw):
+        header, self.pending_upload = self.pending_upload, None
+        if header is None:
+            await self.send_json(
+                {
+                    "status": "error",
+                    "message": "Binary frame without a preceding command header.",
+                }
+            )
+            return
+        if header.get("command") == "audio_chunk":
+            await self.audio_chunk(header, raw)
+            return
+        expected = header.get("audio_bytes")
+        if expected is not None:
+            try:
+                expected = int(expected)
+            except (TypeError, ValueError):
+                expected = -1
+            if expected < 0:
+                await self.send_json(
+                    {
+                        "status": "error",
+                        "message": "audio_bytes must be a non-negative integer.",
+                    }
+                )
+                return
+        if expected is not None and expected != len(raw):
+            await self.send_json(
+                {
+                    "status": "error",
+                    "message": f"Expected {expected} audio bytes, got {len(raw)}.",
+                }
+            )
+            return
+        await self.transcribe(header, raw)
+
+    # ---- chunked uploads ----
+    async def audio_chunk(self, data, raw):
+        """
+        Append one chunk to the open utterance (opened by the first chunk).
+        With auto_endpoint on, the turn starts as soon as the speaker stops.
+        """
+        try:
+            if self.utterance is None:
+                self.utterance = UtteranceStream(data.get("audio_format"), raw)
+                self.utterance_header = data
+            ended = await run_io(self.utterance.feed, raw)
+        except Exception as e:
+            self.close_utterance()
+            await self.send_json({"status": "error", "message": str(e)})
+            return
+
+        auto = bool(data.get("auto_endpoint", self.options["auto_endpoint"]))
+        if ended and auto:
+            # keep the stream (and its decoder) open: the next chunk continues it
+            segment = await run_io(self.utterance.cut)
+            await self.send_json(
+                {
+                    "status": "success",
+                    "type": "utterance_end",
+                    "reason": "silence",
+                    "turn_id": self.session["turn_counter"] + 1,
+                }
+            )
+            await self.transcribe(dict(self.utterance_header or {}), audio_stream=segment)
+
+    async def end_utterance(self, data):
+        stream, header = self.utterance, self.utterance_header or {}
+        self.utterance, self.utterance_header = None, None
+        if stream is None:
+            await self.send_json(
+                {"status": "error", "message": "No open utterance (send audio_chunk first)."}
+            )
+            return
+        if stream.dropped_seconds:
+            print(f"[AUDIO] utterance exceeded buffer, dropped {stream.dropped_seconds:.1f}s")
+        try:
+            await self.transcribe({**header, **data}, audio_stream=stream)
+        finally:
+            stream.close()
+
+    def close_utterance(self):
+        if self.utterance is not None:
+            self.utterance.close()
+        self.utterance, self.utterance_header = None, None
+
+    async def transcribe(self, data, raw_audio=None, audio_stream=None):
+        audio_b64 = data.get("audio")
+        audio_format = data.get("audio_format")
+
+        if audio_stream is not None:
+            print(
+                f"[AUDIO] format={audio_format} chunks={audio_stream.chunks} "
+                f"bytes={audio_stream.bytes_received} (streamed)"
+            )
+            PAYLOAD_BYTES.observe(audio_stream.bytes_received, direction="in", transport="chunked")
+        elif raw_audio is not None:
+            print(f"[AUDIO] format={audio_format} bytes={len(raw_audio)} (binary)")
+            PAYLOAD_BYTES.observe(len(raw_audio), direction="in", transport="binary")
+        else:
+            print(
+                f"[AUDIO] format={audio_format} b64_len={len(audio_b64) if audio_b64 else None}"
+            )
+            PAYLOAD_BYTES.observe(len(audio_b64 or ""), direction="in", transport="base64")
+
+        session = self.session
+        session["turn_counter"] += 1
+        turn_id = session["turn_counter"]
+        speaker_id = session["speaker_id"]
+        stream = bool(data.get("stream", self.options["stream"]))
+        hint = language_hint(
+            session["speaker_languages"],
+            speaker_id,
+            force_detect=bool(data.get("detect_language")),
+            # Speaker 2 answers in Speaker 1's target language
+            fallback=session["last_target_lang"] if speaker_id == 2 else None,
+        )
+        turn = {
+            "session": session,
+            "audio_b64": audio_b64,
+            "audio_bytes": raw_audio,
+            "audio_stream": audio_stream,
+            "audio_format": audio_format,
+            "speaker_id": speaker_id,
+            "target_lang": data.get("target_lang1"),
+            "language_hint": hint,
+            "emotion_timeline": bool(
+                data.get("emotion_timeline", self.options["emotion_timeline"])
+            ),
+        }
 
-    audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-    os.remove(f.name)
-    return audio_b64
+        INFLIGHT_TURNS.inc()
+        outcome = "error"
+        run = None
+        capture = profiler.claim(session["session_id"], turn_id)
+        if capture is not None:
+            capture_token = capture.activate()
+        try:
+            if stream:
+                sender = ProgressiveSender(self, turn_id, f"Speaker {speaker_id}")
+                if data.get("tts_segments", self.options["tts_segments"]):
+                    turn["on_tts_segment"] = sender.on_tts_segment
+                run = await run_speech_turn(turn, on_stage=sender.on_stage)
+                if run.stopped_at == "vad":
+                    outcome = "silence"
+                    await self.send_json(build_silence_response(run, turn_id, speaker_id))
+                    return
+                await self.send_json(
+                    {
+                        "status": "success",
+                        "type": "speech_partial",
+                        "turn_id": turn_id,
+                        "stage": "done",
+                        "speaker": f"Speaker {speaker_id}",
+                        "timings": run.timings_ms(),
+                    }
+                )
+            else:
+                run = await run_speech_turn(turn)
+                if run.stopped_at == "vad":
+                    outcome = "silence"
+                    await self.send_json(build_silence_response(run, turn_id, speaker_id))
+                    return
+                t_send = time.perf_counter()
+                await self.send_json(
+                    build_speech_response(
+                        run, turn_id, speaker_id, self.tts_fields(run.results["tts"])
+                    )
+                )
+                await self.send_tts_audio(turn_id, run.results["tts"])
+                STAGE_LATENCY.observe(time.perf_counter() - t_send, stage="send")
+
+            outcome = "speech"
+            PAYLOAD_BYTES.observe(len(run.results["tts"]), direction="out", transport="tts")
+            learn_language(session["speaker_languages"], speaker_id, run.results["asr"])
+            session["speaker_id"] = 2 if speaker_id == 1 else 1
+
+        except Exception as e:
+            await self.send_json(
+                {"status": "error", "turn_id": turn_id, "message": str(e)}
+            )
+        finally:
+            INFLIGHT_TURNS.dec()
+            TURNS.inc(outcome=outcome)
+            session_registry.save(session)
+            if capture is not None:
+                capture.deactivate(capture_token)
+                timings = run.timings_ms() if run is not None else None
+                try:
+                    await run_io(profiler.finish, capture, timings, outcome)
+                except Exception as e:
+                    print(f"⚠️ Writing profile capture failed: {e}")
 
 
 @app.websocket("/ws/speech")
@@ -93,211 +787,462 @@ async def speech_websocket(websocket: WebSocket):
             "tts_audio_b64": "<base64_encoded_tts_audio_string>"
         },
         "emotion": "happy",
-        "emotion_scores": {"happy": 0.95, "sad": 0.02, ...}
+        "emotion_scores": {"happy": 0.95, "sad": 0.02, ...},
+        "vad": {"trimmed_samples": 17120, "speech_samples": 30880},
+        "language_detection": {"skipped": true, "hint": "ko",
+                               "probability": null, "redetected": false},
+        "timings": {"decode": 8.1, "asr": 412.5, "emotion": 96.3,
+                    "translate": 120.4, "tts": 230.9, "total": 772.0}
     }
+
+    Emotion timeline (opt-in)
+    {"command": "configure", "emotion_timeline": true} (or per transcribe) adds
+    per-window emotions (a single window for turns up to EMOTION_WINDOW_S):
+    "emotion_timeline": [{"start": 0.0, "end": 4.0, "emotion": "neu",
+                          "scores": {...}}, {"start": 2.0, ...}, ...]
+
+    All-silence input skips ASR/emotion/translation/TTS entirely:
+    {"status": "success", "type": "silence", "turn_id": 3, "speaker": ...,
+     "vad": {...}, "timings": {...}}
+
+    Sessions
+    On connect the server sends {"type": "session", "session_id": "..."}.
+    Reconnect with ws://.../ws/speech?session_id=... (or configure with
+    "session_id") to resume speakers, languages and turn ids on any worker.
+
+    Language pinning
+    Each speaker's language is learned from their turns and passed to Whisper
+    as a hint, so detection is skipped. It is re-run when the pinned decode
+    looks wrong, when the transcribe message has "detect_language": true, or
+    after {"command": "configure", "reset_language": true}.
+
+    Streaming mode (opt-in)
+    {"command": "configure", "stream": true}   (or "stream": true per transcribe)
+    → one "speech_partial" message per stage, same "turn_id", in this order:
+      {"type": "speech_partial", "turn_id": 3, "stage": "transcript",
+       "speaker": ..., "original": {...}, "emotion": ..., "emotion_scores": {...}}
+      {"type": "speech_partial", "turn_id": 3, "stage": "translation",
+       "speaker": ..., "translated": {"timestamp", "lang", "text"}}
+      {"type": "speech_partial", "turn_id": 3, "stage": "tts",
+       "speaker": ..., "translated": {..., "tts_audio_b64": "..."}}
+      {"type": "speech_partial", "turn_id": 3, "stage": "done",
+       "speaker": ..., "timings": {...}}
+
+    Segmented TTS (opt-in, streaming mode)
+    {"command": "configure", "stream": true, "tts_segments": true}
+    → the translated text is synthesized sentence by sentence in parallel and
+      each sentence is sent as soon as it (and every sentence before it) is ready,
+      between the "translation" and "tts" messages:
+      {"type": "tts_segment", "turn_id": 3, "index": 0, "total": 3,
+       "final": false, "format": "audio/mpeg", "tts_audio_b64": "..."}
+      The "tts" message then carries "tts_segments": 3 instead of the audio.
+      In binary mode each tts_segment header has "bytes" and is followed by one
+      binary frame with the mp3 segment.
+
+    Binary frames (opt-in)
+    {"command": "configure", "binary": true}
+    → upload:   {"command": "transcribe", "audio_format": "audio/wav",
+                 "audio_bytes": 88244, "target_lang1": "en"}  + <binary frame>
+    → download: result with "tts_audio_binary": true, then
+                {"type": "tts_audio", "turn_id": 3, "format": "audio/mpeg",
+                 "bytes": 23040}  + <binary frame>
+
+    Chunked upload (stream audio while the user is still talking)
+    {"command": "audio_chunk", "audio_format": "audio/wav", "audio": "<b64>",
+     "target_lang1": "en"}                      ← first chunk opens the utterance
+    {"command": "audio_chunk", "audio": "<b64>"} ...
+    {"command": "end_utterance"}               ← runs the turn on the buffered audio
+    With {"command": "configure", "auto_endpoint": true} the server detects the
+    end of speech itself, sends {"type": "utterance_end", "reason": "silence"}
+    and starts the turn without waiting for end_utterance. In binary mode each
+    audio_chunk header (without "audio") is followed by one binary frame.
     """
 
-    global last_source_lang, last_target_lang
     await websocket.accept()
     print("WebSocket connected for speech detection.")
 
-    speaker_id = 1
+    # ?session_id=... resumes a conversation (e.g. after reconnecting to another worker)
+    session = session_registry.open(websocket.query_params.get("session_id"))
+    connection = SpeechConnection(websocket, session)
+    ACTIVE_SESSIONS.inc()
 
     try:
+        await connection.send_json(
+            {"status": "success", "type": "session", "session_id": session["session_id"]}
+        )
         while True:
-            data = await websocket.receive_json()
-            command = data.get("command")
+            kind, payload = await connection.receive()
+            if kind == "bytes":
+                await connection.handle_bytes(payload)
+            else:
+                await connection.handle_text(payload)
+
+    except WebSocketDisconnect:
+        print("Speech WebSocket disconnected.")
+    finally:
+        ACTIVE_SESSIONS.dec()
+        connection.close_utterance()
 
-            if command == "transcribe":
 
-                audio_b64 = data.get("audio")
-                audio_format = data.get("audio_format")
+# -------------------------------
+# Admin: on-demand profiling (X-Admin-Token: $ADMIN_TOKEN)
+# -------------------------------
+def _require_admin(request: Request):
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="admin token required")
 
-                print(
-                    f"[AUDIO] format={audio_format} b64_len={len(audio_b64) if audio_b64 else None}"
-                )
 
-                incoming_target_lang = data.get("target_lang1")
+@app.post("/admin/profile")
+def arm_profiler(request: Request, payload: dict = Body(...)):
+    """
+    Profile the next N speech turns.
+    body: {"turns": N, "session_id": optional — only that session's turns}
+    "turns": 0 cancels.
+    """
+    _require_admin(request)
+    try:
+        return profiler.arm(payload.get("turns", 1), payload.get("session_id"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-                try:
-                    opus_b64 = convert_to_opus_base64(audio_b64, audio_format)
-                    print(f"[AUDIO] converted_opus_b64_len={len(opus_b64)}")
-                    result = detect_language_and_transcribe_from_base64(opus_b64)
-                    source_lang = result["language"]
-                    text = result["text"]
-                    emotion = result["emotion"]
-                    scores = result["scores"]
-
-                    current_speaker = f"Speaker {speaker_id}"
-
-                    if speaker_id == 1:
-                        target_lang = incoming_target_lang
-                        last_source_lang = source_lang
-                        last_target_lang = target_lang
-                    else:
-                        target_lang = last_source_lang
-                        source_lang = last_target_lang
-
-                    translated = translate_json_list(
-                        [
-                            {
-                                "timestamp": datetime.utcnow().isoformat(),
-                                "lang": source_lang,
-                                "text": text,
-                            }
-                        ],
-                        target_lang=target_lang,
-                    )[0]
-
-                    translated_payload = {
-                        "timestamp": translated.get("timestamp"),
-                        "lang": target_lang,
-                        "text": translated.get("translated_text"),
-                        "tts_audio_b64": generate_tts(
-                            translated.get("translated_text"), lang=target_lang
-                        ),
-                    }
 
-                    await websocket.send_json(
-                        {
-                            "status": "success",
-                            "type": "speech",
-                            "speaker": current_speaker,
-                            "original": {"lang": source_lang, "text": text},
-                            "translated": translated_payload,
-                            "emotion": emotion,
-                            "emotion_scores": scores,
-                        }
-                    )
+@app.delete("/admin/profile")
+def disarm_profiler(request: Request):
+    _require_admin(request)
+    return profiler.disarm()
 
-                    speaker_id = 2 if speaker_id == 1 else 1
 
-                except Exception as e:
-                    await websocket.send_json({"status": "error", "message": str(e)})
+@app.get("/admin/profile")
+def profiler_status(request: Request):
+    """Armed turn counts and the stored captures (newest first)."""
+    _require_admin(request)
+    return {**profiler.status(), "captures": profiler.captures()}
 
-            else:
-                await websocket.send_json(
-                    {"status": "error", "message": "Unknown command."}
-                )
 
-    except WebSocketDisconnect:
-        print("Speech WebSocket disconnected.")
+@app.get("/admin/profile/{capture_id}")
+def profile_summary(capture_id: str, request: Request):
+    """Stage timings, executor calls and the top functions of one capture."""
+    _require_admin(request)
+    summary = profiler.summary(capture_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="unknown capture")
+    return summary
+
+
+@app.get("/admin/profile/{capture_id}/{filename}")
+def profile_download(capture_id: str, filename: str, request: Request):
+    """Download python.prof / torch_ops.txt / summary.json of a capture."""
+    _require_admin(request)
+    path = profiler.file_path(capture_id, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="unknown capture file")
+    return FileResponse(path, filename=f"{capture_id}-{filename}")
 
 
 @app.post("/save_emotion")
 async def save_emotion(payload: dict = Body(...)):
-    """Receive WebSocket-style JSON and save it to MongoDB"""
+    """
+    Receive WebSocket-style JSON and queue it for MongoDB (db/bulk_writer.py).
+    The document is written with the next batch, normally within MONGO_WRITE_FLUSH_MS.
+    """
     try:
         # Add timestamp if not included
         if "timestamp" not in payload:
-            from datetime import datetime
-
             payload["timestamp"] = datetime.utcnow().isoformat()
 
         # Insert JSON as-is
-        result = emotions_collection.insert_one(payload)
+        saved_data = dict(payload)
+        inserted_id = await emotion_writer.put(payload)
 
-        print("MongoDB insert result:", result.inserted_id)
         # Return confirmation
         return {
             "status": "success",
-            "inserted_id": str(result.inserted_id),
-            "saved_data": payload,
+            "inserted_id": str(inserted_id),
+            "saved_data": saved_data,
         }
 
+    except BulkWriteFull as e:
+        print("MongoDB write buffer full:", e)
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
     except Exception as e:
         print("MongoDB insert error:", e)
         return {"status": "error", "message": str(e)}
 
 
+@app.on_event("startup")
+async def _start_session_eviction():
+    app.state.session_eviction = asyncio.create_task(session_registry.run_eviction())
+
+
+@app.on_event("startup")
+async def _ensure_emotion_indexes():
+    try:
+        await run_io(ensure_indexes, emotions_collection)
+    except Exception as e:
+        print(f"⚠️ Creating emotions indexes failed: {e}")
+
+
+@app.on_event("startup")
+def _warm_up_models():
+    """Load + warm Whisper and the emotion model without blocking startup."""
+    if MODEL_EXECUTOR == "process":
+        # the models live in the worker processes; each warms up in its initializer
+        start_model_workers()
+    elif MODEL_WARMUP:
+        model_registry.warm_up_in_background()
+
+
+@app.on_event("startup")
+async def _prewarm_tts_cache():
+    """Synthesize the TTS_CACHE_PREWARM phrase list in the background."""
+    if not (TTS_CACHE_ENABLED and TTS_CACHE_PREWARM):
+        return
+    try:
+        phrases = load_prewarm_phrases(TTS_CACHE_PREWARM)
+    except OSError as e:
+        print(f"⚠️ TTS prewarm list not readable: {e}")
+        return
+    # _stage_tts caches per sentence, so prewarm the same sentence keys
+    sentences = [
+        (sentence, lang) for text, lang in phrases for sentence in split_sentences(text)
+    ]
+    app.state.tts_prewarm = asyncio.ensure_future(
+        run_io(prewarm, sentences, lambda text, lang: synthesize_tts(text, lang=lang))
+    )
+
+
+@app.on_event("startup")
+async def _start_emotion_writer():
+    emotion_writer.start()
+
+
+@app.on_event("shutdown")
+async def _flush_emotion_writer():
+    """Write the queued emotion documents before the io pool goes away."""
+    await emotion_writer.close(timeout=10.0)
+
+
+@app.on_event("shutdown")
+def _shutdown_executors():
+    shutdown_executors(wait=False)
+    task = getattr(app.state, "session_eviction", None)
+    if task is not None:
+        task.cancel()
+
+
 @app.get("/")
 def root():
     return {"message": "FastAPI minimal test successful."}
 
 
-# MongoDB Connection
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client[os.getenv("DB_NAME")]
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe: 503 until the models are loaded and warmed up, so the
+    orchestrator only routes traffic to a hot worker. With MODEL_WARMUP=0 the
+    models load on the first turn and the worker is ready immediately.
+    With MODEL_EXECUTOR=process readiness means every worker process is warm.
+    """
+    if not MODEL_WARMUP:
+        is_ready = True
+    elif MODEL_EXECUTOR == "process":
+        is_ready = model_workers_ready()
+    else:
+        is_ready = model_registry.is_ready()
+    content = {"ready": is_ready, "models": model_registry.status()}
+    if MODEL_EXECUTOR == "process":
+        content["model_workers"] = executor_stats()["model"]
+    return JSONResponse(status_code=200 if is_ready else 503, content=content)
+
+
+@app.get("/stats/batching")
+def batching_stats():
+    """Emotion micro-batcher throughput / latency counters (for tuning the window)."""
+    return emotion_batcher.stats()
+
+
+@app.get("/stats/translation_cache")
+def translation_cache_stats():
+    """Translation cache hit/miss counters."""
+    return translation_cache.stats()
+
+
+@app.get("/stats/mongo_writer")
+def mongo_writer_stats():
+    """Write-behind buffer depth and write counters."""
+    return emotion_writer.stats()
+
+
+@app.get("/stats/tts_cache")
+def tts_cache_stats():
+    """TTS audio cache hit/miss counters and tier sizes."""
+    return tts_cache.stats()
+
+
+# -------------------------------
+# Prometheus metrics
+# -------------------------------
+# Stage/turn latencies and session gauges are updated on the hot path (see
+# ai/metrics.py); everything below is read from the existing stats at scrape time.
+def _collect_cache_metrics():
+    for cache, stats in (("translation", translation_cache.stats()), ("tts", tts_cache.stats())):
+        yield ("emoai_cache_hits_total", "counter", "Cache hits by tier",
+               {"cache": cache, "tier": "memory"}, stats["memory_hits"])
+        yield ("emoai_cache_hits_total", "counter", "Cache hits by tier",
+               {"cache": cache, "tier": "disk"}, stats["disk_hits"])
+        yield ("emoai_cache_misses_total", "counter", "Cache misses",
+               {"cache": cache}, stats["misses"])
+        yield ("emoai_cache_hit_ratio", "gauge", "Cache hit ratio since start",
+               {"cache": cache}, stats["hit_rate"])
+        yield ("emoai_cache_entries", "gauge", "Entries in the memory tier",
+               {"cache": cache}, stats["memory_entries"])
+
+
+def _collect_batcher_metrics():
+    stats = emotion_batcher.stats()
+    labels = {"batcher": stats["name"]}
+    yield ("emoai_batcher_queue_depth", "gauge", "Requests waiting for a batch",
+           labels, stats["pending"])
+    yield ("emoai_batcher_batches_total", "counter", "Batches run", labels, stats["batches"])
+    yield ("emoai_batcher_items_total", "counter", "Requests completed",
+           labels, stats["completed"])
+    yield ("emoai_batcher_avg_batch_size", "gauge", "Average batch size", labels,
+           stats["avg_batch_size"])
+
+
+def _collect_model_metrics():
+    for name, status in model_registry.status().items():
+        yield ("emoai_model_ready", "gauge", "1 when the model is loaded and warmed up",
+               {"model": name}, 1 if status["state"] == "ready" else 0)
+
+
+def _collect_executor_metrics():
+    for name, pool in executor_stats().items():
+        yield ("emoai_executor_workers", "gauge", "Executor pool size",
+               {"executor": name, "kind": pool["kind"]}, pool["workers"])
+        if pool["queue_depth"] is not None:
+            yield ("emoai_executor_queue_depth", "gauge", "Calls waiting for a worker",
+                   {"executor": name}, pool["queue_depth"])
+
+
+def _collect_session_metrics():
+    store = session_registry.store
+    if hasattr(store, "__len__"):
+        yield ("emoai_stored_sessions", "gauge", "Sessions held by the session store",
+               {}, len(store))
+    yield ("emoai_translate_retries_total", "counter", "HTTP translation retries", {},
+           http_translate_client.retry_count)
+
+
+for _collector in (
+    _collect_cache_metrics,
+    _collect_batcher_metrics,
+    _collect_model_metrics,
+    _collect_executor_metrics,
+    _collect_session_metrics,
+):
+    register_collector(_collector)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# MongoDB (shared client from db/connection.py)
 emotions_collection = db["emotions"]
+emotion_writer = BulkWriter(emotions_collection, name="emotions")
 
 
-@app.get("/emotions")
-def get_emotions():
-    emotions = list(emotions_collection.find())
-    for e in emotions:
-        e["_id"] = str(e["_id"])
-    return emotions
-
-
-def _suffix_from_audio_format(audio_format: str | None) -> str:
-    fmt = (audio_format or "").lower()
-    if "webm" in fmt:
-        return ".webm"
-    if "ogg" in fmt:
-        return ".ogg"
-    if "wav" in fmt:
-        return ".wav"
-    if "mp3" in fmt:
-        return ".mp3"
-    if "m4a" in fmt or "mp4" in fmt:
-        return ".m4a"
-    return ".bin"
+def _emotions_query(since, until, emotion, speaker, fields, sort, order):
+    """→ (query, projection, descending); 400 on invalid parameters."""
+    try:
+        return (
+            build_query(since=since, until=until, emotion=emotion, speaker=speaker),
+            build_projection(fields, sort),
+            check_order(sort, order),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-def convert_to_opus_base64(audio_b64: str, audio_format: str | None) -> str:
-    """
-    base64로 받은 오디오(ogg/webm/opus/wav 등)를 ffmpeg로 16kHz mono OPUS로 변환한 뒤,
-    변환된 OPUS를 다시 base64로 반환.
+@app.get("/emotions")
+def get_emotions(
+    response: Response,
+    limit: int = EMOTIONS_PAGE_SIZE,
+    cursor: str = None,
+    sort: str = "_id",
+    order: str = "asc",
+    fields: str = None,
+    since: str = None,
+    until: str = None,
+    emotion: str = None,
+    speaker: str = None,
+):
     """
-    raw_bytes = base64.b64decode(audio_b64)
-    in_suffix = _suffix_from_audio_format(audio_format)
+    One page of saved emotions; pass the X-Next-Cursor header back as ?cursor=
+    for the next page (absent on the last page).
 
-    in_path = None
-    out_path = None
+    fields: comma-separated projection, e.g. "emotion,speaker,timestamp"
+    since / until: ISO timestamps, until is exclusive
+    emotion / speaker: value or comma-separated list
+    sort: _id | timestamp, order: asc | desc
+    """
+    query, projection, descending = _emotions_query(
+        since, until, emotion, speaker, fields, sort, order
+    )
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=in_suffix) as fin:
-            fin.write(raw_bytes)
-            fin.flush()
-            in_path = fin.name
-
-        out_path = in_path + ".opus"
-
-        # whisper + emotion 파이프라인에 맞게 16kHz mono로 통일
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-hide_banner",
-            "-loglevel",
-            "error",
-            "-i",
-            in_path,
-            "-ac",
-            "1",
-            "-ar",
-            "16000",
-            "-c:a",
-            "libopus",
-            "-f",
-            "ogg",
-            out_path,
-        ]
-        subprocess.run(cmd, check=True)
-
-        with open(out_path, "rb") as f:
-            opus_bytes = f.read()
-
-        return base64.b64encode(opus_bytes).decode("utf-8")
-    finally:
-        if in_path:
-            try:
-                os.remove(in_path)
-            except OSError:
-                pass
-        if out_path:
-            try:
-                os.remove(out_path)
-            except OSError:
-                pass
+        emotions, next_cursor = find_page(
+            emotions_collection,
+            query,
+            projection,
+            sort=sort,
+            descending=descending,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return emotions
+
+
+@app.get("/emotions/export")
+def export_emotions(
+    cursor: str = None,
+    sort: str = "_id",
+    order: str = "asc",
+    fields: str = None,
+    since: str = None,
+    until: str = None,
+    emotion: str = None,
+    speaker: str = None,
+):
+    """Every matching document as NDJSON, streamed from a Mongo cursor."""
+    query, projection, descending = _emotions_query(
+        since, until, emotion, speaker, fields, sort, order
+    )
+    if cursor:
+        try:
+            decode_cursor(cursor, sort)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        iter_ndjson(
+            emotions_collection,
+            query,
+            projection,
+            sort=sort,
+            descending=descending,
+            cursor=cursor,
+        ),
+        media_type="application/x-ndjson",
+    )
 
 
 # websocket endpoint for real-time emotion detection and collection, json responses.
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+
+# -------------------------------
+# Session registry
+# -------------------------------
+# Conversation state that used to live in module globals (last_source_lang /
+# last_target_lang) is kept per session id, so concurrent connections no longer
+# overwrite each other and any worker behind a load balancer can resume a
+# session.
+#
+#   SESSION_STORE=memory (default) → in-process dict, idle sessions evicted
+#   SESSION_STORE=redis            → shared store (REDIS_URL), TTL-based expiry
+#
+# Session state is a plain JSON dict.
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_EVICT_INTERVAL = float(os.getenv("SESSION_EVICT_INTERVAL", "60"))
+
+
+def new_session_state(session_id: str) -> dict:
+    now = time.time()
+    return {
+        "session_id": session_id,
+        "created_at": now,
+        "last_seen": now,
+        "speaker_id": 1,
+        "turn_counter": 0,
+        "last_source_lang": None,
+        "last_target_lang": None,
+        "speaker_languages": {},
+    }
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+class InMemorySessionStore:
+    """Single-process store. Sessions idle longer than ttl are evicted."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            state = self._data.get(session_id)
+            return json.loads(state) if state is not None else None
+
+    def put(self, state, ttl):
+        with self._lock:
+            self._data[state["session_id"]] = json.dumps(state)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def evict_idle(self, ttl):
+        cutoff = time.time() - ttl
+        evicted = []
+        with self._lock:
+            for session_id, raw in list(self._data.items()):
+                if json.loads(raw)["last_seen"] < cutoff:
+                    del self._data[session_id]
+                    evicted.append(session_id)
+        return evicted
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class KeyValueSessionStore:
+    """
+    Shared store over any client with redis-style get / set(ex=) / delete.
+    Expiry is delegated to the store (every put refreshes the TTL).
+    """
+
+    def __init__(self, client, prefix="emoai:session:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, session_id):
+        raw = self.client.get(self.prefix + session_id)
+        return json.loads(raw) if raw else None
+
+    def put(self, state, ttl):
+        self.client.set(
+            self.prefix + state["session_id"], json.dumps(state), ex=int(ttl)
+        )
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+    def evict_idle(self, ttl):
+        return []  # the store expires keys itself
+
+
+class LocalKeyValueClient:
+    """
+    In-process stand-in for a redis client (get / set(ex=) / delete), so the
+    shared-store code path can run without a redis server.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+def create_session_store(kind=SESSION_STORE):
+    if kind == "redis":
+        import redis
+
+        return KeyValueSessionStore(redis.Redis.from_url(os.getenv("REDIS_URL")))
+    if kind == "local-kv":
+        return KeyValueSessionStore(LocalKeyValueClient())
+    return InMemorySessionStore()
+
+
+# -------------------------------
+# Registry
+# -------------------------------
+class SessionRegistry:
+    def __init__(self, store, idle_ttl=SESSION_IDLE_TTL):
+        self.store = store
+        self.idle_ttl = idle_ttl
+
+    def open(self, session_id=None) -> dict:
+        """Resume session_id if the store still has it, else start a new one."""
+        if session_id:
+            state = self.store.get(session_id)
+            if state is not None:
+                state["last_seen"] = time.time()
+                self.store.put(state, self.idle_ttl)
+                return state
+        state = new_session_state(session_id or uuid.uuid4().hex)
+        self.store.put(state, self.idle_ttl)
+        return state
+
+    def save(self, state: dict):
+        state["last_seen"] = time.time()
+        self.store.put(state, self.idle_ttl)
+
+    def close(self, session_id):
+        self.store.delete(session_id)
+
+    def evict_idle(self):
+        return self.store.evict_idle(self.idle_ttl)
+
+    async def run_eviction(self, interval=SESSION_EVICT_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"[SESSION] evicted {len(evicted)} idle session(s)")
+
+
+session_registry = SessionRegistry(create_session_store())
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from db.bulk_writer import BulkWriteFull, BulkWriter
+
+
+# -------------------------------
+# Fake collection: records every insert_many, can fail on demand
+# -------------------------------
+class DuplicateKeyError(Exception):
+    def __init__(self, count):
+        super().__init__("E11000 duplicate key")
+        self.details = {"writeErrors": [{"code": 11000}] * count}
+
+
+class FakeCollection:
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        with self._lock:
+            self.calls += 1
+            if self.failures:
+                self.failures -= 1
+                raise (self.error or ConnectionError("mongo unavailable"))
+            self.batches.append([d["_id"] for d in documents])
+
+    @property
+    def written(self):
+        return [i for batch in self.batches for i in batch]
+
+
+def _docs(n, start=0):
+    return [{"_id": i, "emotion": "happy"} for i in range(start, start + n)]
+
+
+async def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_flush_on_batch_size():
+    async def main():
+        collection = FakeCollection()
+        writer = BulkWriter(collection, max_batch=3, flush_ms=60_000, name="t-size")
+        for document in _docs(7):
+            await writer.put(document)
+        # two full batches go out long before the 60 s timer
+        await _wait_for(lambda: len(collection.batches) == 2)
+        assert collection.batches == [[0, 1, 2], [3, 4, 5]]
+        await writer.close()
+        assert collection.batches[-1] == [6]
+
+    asyncio.run(main())
+
+
+def test_flush_on_interval():
+    async def main():
+        collection = FakeCollection()
+        writer = BulkWriter(collection, max_batch=100, flush_ms=50, name="t-interval")
+        t0 = time.monotonic()
+        for document in _docs(2):
+            await writer.put(document)
+        await _wait_for(lambda: collection.batches)
+        assert time.monotonic() - t0 >= 0.04
+        assert collection.batches == [[0, 1]]
+        assert writer.stats()["written"] == 2
+        await writer.close()
+
+    asyncio.run(main())
+
+
+def test_close_writes_everything_queued():
+    async def main():
+        collection = FakeCollection()
+        writer = BulkWriter(collection, max_batch=100, flush_ms=60_000, name="t-close")
+        for document in _docs(5):
+            await writer.put(document)
+        t0 = time.monotonic()
+        await writer.close()
+        # close() does not sit out the flush timer
+        assert time.monotonic() - t0 < 1.0
+        assert collection.written == [0, 1, 2, 3, 4]
+        assert writer.stats()["written"] == 5
+        assert writer._task is None
+
+    asyncio.run(main())
+
+
+def test_failed_batch_is_retried():
+    async def main():
+        collection = FakeCollection(failures=2)
+        writer = BulkWriter(collection, max_batch=10, flush_ms=10, retries=3, name="t-retry")
+        for document in _docs(4):
+            await writer.put(document)
+        await writer.flush()
+        assert collection.calls == 3
+        assert collection.written == [0, 1, 2, 3]
+        assert writer.stats()["failed"] == 0
+        await writer.close()
+
+    asyncio.run(main())
+
+
+def test_batch_is_dropped_after_retry_limit():
+    async def main():
+        collection = FakeCollection(failures=10)
+        writer = BulkWriter(collection, max_batch=10, flush_ms=10, retries=1, name="t-give-up")
+        for document in _docs(3):
+            await writer.put(document)
+        await writer.flush()
+        assert collection.calls == 2
+        assert collection.written == []
+        assert writer.stats()["failed"] == 3
+        # the writer keeps going after giving up on a batch
+        collection.failures = 0
+        await writer.put({"_id": 99})
+        await writer.close()
+        assert collection.written == [99]
+
+    asyncio.run(main())
+
+
+def test_duplicate_keys_after_partial_write_count_as_written():
+    async def main():
+        collection = FakeCollection(failures=1, error=DuplicateKeyError(2))
+        writer = BulkWriter(collection, max_batch=10, flush_ms=10, name="t-dup")
+        for document in _docs(2):
+            await writer.put(document)
+        await writer.close()
+        assert collection.calls == 1
+        assert writer.stats()["written"] == 2
+        assert writer.stats()["failed"] == 0
+
+    asyncio.run(main())
+
+
+def test_put_times_out_when_buffer_is_full():
+    async def main():
+        class SlowCollection(FakeCollection):
+            def insert_many(self, documents, ordered=True):
+                time.sleep(0.3)
+                super().insert_many(documents, ordered)
+
+        collection = SlowCollection()
+        writer = BulkWriter(
+            collection, max_batch=1, flush_ms=0, max_queue=1, put_timeout=0.05,
+            name="t-full",
+        )
+        await writer.put({"_id": 1})  # taken by the drain task, now writing
+        await asyncio.sleep(0.05)
+        await writer.put({"_id": 2})  # fills the queue
+        with pytest.raises(BulkWriteFull):
+            await writer.put({"_id": 3})
+        await writer.close()
+        assert collection.written == [1, 2]
+
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import http.server
+import json
+import threading
+import urllib.parse
+
+import pytest
+
+from ai.translation_client import HttpTranslateClient, TransientTranslationError
+
+
+# -------------------------------
+# Local gtx stand-in with scripted failures
+# -------------------------------
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status = server.statuses.pop(0) if server.statuses else 200
+        if status != 200:
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        text = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["q"][0]
+        body = json.dumps([[[f"[ko] {text}", text, None, None]]]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def translate_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.statuses = []
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.endpoint = f"http://127.0.0.1:{server.server_port}/translate_a/single"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(server, retries=3):
+    return HttpTranslateClient(endpoint=server.endpoint, retries=retries, backoff=0.0)
+
+
+def test_translate_succeeds_without_retry(translate_server):
+    client = _client(translate_server)
+    assert client.translate("hello", "ko", "en") == "[ko] hello"
+    assert translate_server.requests == 1
+    assert client.retry_count == 0
+
+
+def test_translate_retries_on_5xx(translate_server):
+    translate_server.statuses = [503, 500]
+    client = _client(translate_server)
+    assert client.translate("hello", "ko", "en") == "[ko] hello"
+    assert translate_server.requests == 3
+    assert client.retry_count == 2
+
+
+def test_translate_gives_up_after_retry_limit(translate_server):
+    translate_server.statuses = [502] * 10
+    client = _client(translate_server, retries=2)
+    with pytest.raises(TransientTranslationError):
+        client.translate("hello", "ko", "en")
+    assert translate_server.requests == 3
+    assert client.retry_count == 2
+
+
+def test_client_error_is_not_retried(translate_server):
+    translate_server.statuses = [400]
+    client = _client(translate_server)
+    with pytest.raises(Exception) as raised:
+        client.translate("hello", "ko", "en")
+    assert not isinstance(raised.value, TransientTranslationError)
+    assert translate_server.requests == 1
+
+
+def test_translate_many_keeps_order_and_counts_retries(translate_server):
+    translate_server.statuses = [500] * 4
+    client = _client(translate_server)
+    texts = ["a", "b", "a", "c", "", "d"]
+    assert client.translate_many(texts, "ko", "en") == [
+        "[ko] a", "[ko] b", "[ko] a", "[ko] c", "", "[ko] d",
+    ]
+    # "a" is sent once; every scripted 500 costs exactly one retry
+    assert translate_server.requests == 4 + 4
+    assert client.retry_count == 4
+
+
+def test_translate_many_returns_none_for_exhausted_items(translate_server):
+    translate_server.statuses = [503] * 2
+    client = _client(translate_server, retries=1)
+    assert client.translate_many(["only"], "ko", "en") == [None]
+    assert translate_server.requests == 2